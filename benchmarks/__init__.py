@@ -0,0 +1,37 @@
+"""
+Benchmarks for django_inlines.
+
+These aren't part of the test suite. Run them from the repository root, e.g.::
+
+    python -m benchmarks.inline_finder
+
+``benchmarks.suite`` runs the whole pipeline over reproducible synthetic
+corpora and can write JSON to compare between versions::
+
+    python -m benchmarks.suite --json results.json
+
+They use the settings from the ``tests`` project.
+"""
+import os
+import sys
+import timeit
+
+
+def setup_django():
+    """
+    Makes the ``tests`` project importable and points Django at its settings.
+    """
+    tests_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests')
+    if tests_dir not in sys.path:
+        sys.path.insert(0, tests_dir)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'settings')
+
+
+def bench(label, stmt, number=10000, repeat=3):
+    """
+    Times `stmt` (a callable) and prints the best per-call time in microseconds.
+    """
+    best = min(timeit.repeat(stmt, number=number, repeat=repeat))
+    usec = best / number * 1e6
+    sys.stdout.write("%-45s %10.2f usec/call\n" % (label, usec))
+    return usec
@@ -0,0 +1,111 @@
+"""
+Synthetic corpora for the benchmark suite.
+
+Every corpus is built from a seeded `random.Random`, so the same seed always
+gives the same texts and results from different versions can be compared.
+"""
+import random
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    "tempor incididunt ut labore et dolore magna aliqua enim ad minim veniam "
+    "quis nostrud exercitation ullamco laboris nisi aliquip ex ea commodo "
+    "consequat duis aute irure in reprehenderit voluptate velit esse cillum"
+).split()
+
+VIDEO_IDS = ['RXJKdh1KZ0w', 'C_ZebDKv1zo', '4R-7ZO4I1pI', 'dQw4w9WgXcQ']
+
+
+def sentence(rng, words=12):
+    text = ' '.join([rng.choice(WORDS) for i in range(words)])
+    return text[0].upper() + text[1:] + '.'
+
+
+def paragraph(rng, sentences=5):
+    return ' '.join([sentence(rng, rng.randint(6, 18)) for i in range(sentences)])
+
+
+def text_inline(rng):
+    """
+    An inline that doesn't touch the database.
+    """
+    choice = rng.randint(0, 2)
+    if choice == 0:
+        return '{{ youtube %s }}' % rng.choice(VIDEO_IDS)
+    if choice == 1:
+        return '{{ youtube %s width=%d height=%d }}' % (rng.choice(VIDEO_IDS), rng.randint(2, 9) * 100, rng.randint(2, 6) * 100)
+    return '{{ echo %s }}' % rng.choice(WORDS)
+
+
+def user_inline(rng, pks):
+    if rng.randint(0, 3) == 0:
+        return '{{ user:contact %d }}' % rng.choice(pks)
+    return '{{ user %d }}' % rng.choice(pks)
+
+
+def inline_free(rng, pks, count=200):
+    """
+    Comments and short descriptions without any inlines.
+    """
+    return [paragraph(rng, rng.randint(1, 4)) for i in range(count)]
+
+
+def dense_inlines(rng, pks, count=50):
+    """
+    Short texts that are mostly inlines.
+    """
+    texts = []
+    for i in range(count):
+        bits = []
+        for j in range(rng.randint(10, 30)):
+            bits.append(text_inline(rng))
+            bits.append(sentence(rng, 4))
+        texts.append(' '.join(bits))
+    return texts
+
+
+def many_model_pks(rng, pks, count=50):
+    """
+    Articles that each embed many different objects.
+    """
+    texts = []
+    for i in range(count):
+        bits = []
+        for j in range(rng.randint(5, 20)):
+            bits.append(paragraph(rng, 2))
+            bits.append(user_inline(rng, pks))
+        texts.append('\n\n'.join(bits))
+    return texts
+
+
+def large_documents(rng, pks, count=3, paragraphs=2000):
+    """
+    Very long documents, like books, with an inline every few paragraphs.
+    """
+    texts = []
+    for i in range(count):
+        bits = []
+        for j in range(paragraphs):
+            bits.append(paragraph(rng))
+            if rng.randint(0, 4) == 0:
+                bits.append(rng.choice([text_inline(rng), user_inline(rng, pks)]))
+        texts.append('\n\n'.join(bits))
+    return texts
+
+
+CORPORA = (
+    ('inline_free', inline_free),
+    ('dense_inlines', dense_inlines),
+    ('many_model_pks', many_model_pks),
+    ('large_documents', large_documents),
+)
+
+
+def build(seed, pks):
+    """
+    Returns a list of (name, texts) pairs for every corpus.
+    """
+    corpora = []
+    for name, func in CORPORA:
+        corpora.append((name, func(random.Random('%s.%s' % (seed, name)), pks)))
+    return corpora
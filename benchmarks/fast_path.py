@@ -0,0 +1,57 @@
+"""
+Measures `Registry.process` and the `stripinlines` filter over a mix of text
+like a typical site's: mostly comments and short descriptions without any
+inlines, some bodies with a few and a few with a lot.
+
+The "regex" numbers are what both used to do for every value: a `sub` over
+the whole text, or compiling and rendering it.
+"""
+from benchmarks import setup_django, bench
+setup_django()
+
+from django_inlines import inlines
+from django_inlines.inlines import InlineBase
+from django_inlines.templatetags.inlines import stripinlines
+
+
+class EchoInline(InlineBase):
+    def render(self):
+        return self.value
+
+
+COMMENT = "Thanks for writing this up, it saved me an afternoon of digging through the docs. "
+PARAGRAPH = "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore. "
+
+# 80 inline free texts, 15 with a few inlines and 5 with a lot.
+CORPUS = (
+    [COMMENT * (1 + i % 3) for i in range(40)] +
+    [PARAGRAPH * (1 + i % 8) for i in range(40)] +
+    [(PARAGRAPH * 3 + "{{ echo %d }} " % i) * 3 for i in range(15)] +
+    [(PARAGRAPH + "{{ echo %d }} {{ echo:big %d size=2 }} " % (i, i)) * 50 for i in range(5)]
+)
+
+
+def main():
+    # stripinlines always uses the default registry.
+    registry = inlines.registry
+    registry.register('echo', EchoInline)
+    free = [text for text in CORPUS if registry.START_TAG not in text]
+    for text in CORPUS:
+        registry.compile(text)
+
+    bench("stripinlines, regex (%d texts)" % len(CORPUS),
+        lambda: [registry.inline_finder.sub('', text) for text in CORPUS], number=200)
+    bench("stripinlines (%d texts)" % len(CORPUS),
+        lambda: [stripinlines(text) for text in CORPUS], number=200)
+    bench("process, compile and render (%d texts)" % len(CORPUS),
+        lambda: [registry.compile(text).render() for text in CORPUS], number=200)
+    bench("process (%d texts)" % len(CORPUS),
+        lambda: [registry.process(text) for text in CORPUS], number=200)
+    bench("process, compile and render (%d inline free)" % len(free),
+        lambda: [registry.compile(text).render() for text in free], number=200)
+    bench("process (%d inline free)" % len(free),
+        lambda: [registry.process(text) for text in free], number=200)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Compares reading the cached `Registry.inline_finder` against compiling the
+pattern on every call, which is what the property used to do.
+"""
+import re
+
+from benchmarks import setup_django, bench
+setup_django()
+
+from django_inlines.inlines import Registry
+
+
+def uncached_finder(registry):
+    return re.compile(r'%(start)s\s*(.+?)\s*%(end)s' % {
+        'start': re.escape(registry.START_TAG),
+        'end': re.escape(registry.END_TAG),
+    })
+
+
+def main():
+    registry = Registry()
+    text = "A short body with no inlines at all, like most comment fields."
+
+    bench("inline_finder (compiled per call)", lambda: uncached_finder(registry))
+    bench("inline_finder (cached)", lambda: registry.inline_finder)
+    bench("finder.sub (compiled per call)", lambda: uncached_finder(registry).sub('', text))
+    bench("finder.sub (cached)", lambda: registry.inline_finder.sub('', text))
+
+
+if __name__ == '__main__':
+    main()
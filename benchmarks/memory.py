@@ -0,0 +1,97 @@
+"""
+Measures the memory used per inline by compiled content and by inline
+instances, comparing the slotted `ParsedInline`, `InlineCall` and inline
+classes against plain tuples and classes with a `__dict__`, which is what
+they used to be.
+
+Sizes come from `sys.getsizeof`, so it runs on every Python. Each record is
+counted with its own `__dict__`, if it has one, but not the strings and
+values it shares with the others.
+"""
+import gc
+import sys
+
+from benchmarks import setup_django
+setup_django()
+
+from django_inlines.inlines import Registry, ParsedInline, InlineCall
+from django_inlines.samples import YoutubeInline
+
+COUNT = 10000
+
+
+class DictYoutubeInline(YoutubeInline):
+    """
+    A subclass without `__slots__`, so instances get a `__dict__` as they did
+    before.
+    """
+
+
+class DictInlineCall(object):
+    """
+    `InlineCall` as it was, without `__slots__`.
+    """
+    def __init__(self, source, name=None, value="", variant=None, kwargs=(), inline=None, error=None):
+        self.source = source
+        self.name = name
+        self.value = value
+        self.variant = variant
+        self.kwargs = kwargs
+        self.inline = inline
+        self.cls = None
+        self.error = error
+        self.key = (name, value, variant, kwargs)
+
+
+def footprint(obj):
+    """
+    The bytes `obj` takes up itself, with its instance dictionary.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def measure(label, make):
+    gc.collect()
+    kept = make()
+    size = sum([footprint(item) for item in kept])
+    sys.stdout.write("%-45s %8.1f bytes/inline\n" % (label, float(size) / COUNT))
+    return kept
+
+
+def compiled_records(compiled):
+    """
+    The containers and calls a `CompiledInlines` holds, without the literal
+    text between them.
+    """
+    return [compiled, compiled.nodes, compiled.calls] + list(compiled.calls)
+
+
+def main():
+    sources = ["youtube:big v%d width=%d height=200" % (i, i % 7) for i in range(COUNT)]
+    registry = Registry()
+    registry.register('youtube', YoutubeInline)
+    text = ' '.join(["{{ %s }}" % source for source in sources])
+
+    def tuples():
+        parsed = []
+        for source in sources:
+            p = ParsedInline.from_source(source)
+            parsed.append(tuple(p))
+        return parsed
+
+    measure("parse records, plain tuples", tuples)
+    measure("parse records, ParsedInline", lambda: [ParsedInline.from_source(source) for source in sources])
+    parsed = [ParsedInline.from_source(source) for source in sources]
+    inline = registry.snapshot.get('youtube')
+    measure("calls with a __dict__", lambda: [DictInlineCall(*(tuple(p)[:5] + (inline,))) for p in parsed])
+    measure("InlineCall", lambda: [InlineCall(*(tuple(p)[:5] + (inline,))) for p in parsed])
+    measure("compiled text", lambda: compiled_records(registry.link(registry.parse(text))))
+    measure("inline instances with a __dict__", lambda: [DictYoutubeInline(p.value, variant=p.variant, template_dir='sidebar', **dict(p.kwargs)) for p in parsed])
+    measure("slotted inline instances", lambda: [YoutubeInline(p.value, variant=p.variant, template_dir='sidebar', **dict(p.kwargs)) for p in parsed])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Compares `parse_inline` against the regex based parser it replaced over a
+corpus of inline strings.
+"""
+import re
+import sys
+
+from benchmarks import setup_django, bench
+setup_django()
+
+from django_inlines.inlines import parse_inline
+
+
+# The old splitter's "[^\Z]" is really "any character but Z" on Python 2,
+# so it gets values with a capital Z wrong, and Python 3.7 and later refuse to
+# compile it at all. It's compiled when it's first used, and left out of the
+# comparison where it can't be.
+LEGACY_SPLITTER_PATTERN = r"""
+    (?P<name>[a-z_]+)       # Must start with a lowercase + underscores name
+    (?::(?P<variant>\w+))?  # Variant is optional, ":variant"
+    (?:(?P<args>[^\Z]+))? # args is everything up to the end
+    """
+_legacy_splitter = []
+
+
+def get_legacy_splitter():
+    """
+    Returns the old splitter regex, or None if this Python can't compile it.
+    """
+    if not _legacy_splitter:
+        try:
+            _legacy_splitter.append(re.compile(LEGACY_SPLITTER_PATTERN, re.VERBOSE))
+        except re.error:
+            _legacy_splitter.append(None)
+    return _legacy_splitter[0]
+
+LEGACY_KWARG_PARSER = re.compile(r"""
+    (?P<kwargs>(?:\s\b[a-z_]+=\w+\s?)+)?\Z # kwargs match everything at the end in groups " name=arg"
+    """, re.VERBOSE)
+
+
+def legacy_parse_inline(text):
+    m = get_legacy_splitter().match(text)
+    if not m:
+        raise ValueError
+    args = m.group('args')
+    name = m.group('name')
+    value = ""
+    kwtxt = ""
+    kwargs = {}
+    if args:
+        kwtxt = LEGACY_KWARG_PARSER.search(args).group('kwargs')
+        value = re.sub(r"%s\Z" % kwtxt, "", args)
+        value = value.strip()
+    if m.group('variant'):
+        kwargs['variant'] = m.group('variant')
+    if kwtxt:
+        for kws in kwtxt.split():
+            k, v = kws.split('=')
+            kwargs[str(k)] = v
+    return (name, value, kwargs)
+
+
+CORPUS = [
+    'simple',
+    'photo 12',
+    'user:contact 1',
+    'youtube 4R-7ZO4I1pI width=850 height=500',
+    'youtube http://www.youtube.com/watch?v=nsBAj6eopzc&hd=1&feature=hd#top',
+    'youtube:hd http://www.youtube.com/watch?v=nsBAj6eopzc&hd=1&feature=hd#top width=400 height=200',
+    'quote:pull A fairly long value with several words in it and some punctuation, too. align=left',
+    'gallery 1 2 3 4 5 6 7 8 9 10 columns=5 size=small crop=true',
+]
+
+
+def parse_corpus(parser):
+    for text in CORPUS:
+        parser(text)
+
+
+def main():
+    if get_legacy_splitter() is None:
+        sys.stdout.write("The regex parser can't be compiled on this version of Python; skipping it.\n")
+    else:
+        # The old parser is only right for text without a capital Z.
+        for text in CORPUS:
+            if 'Z' not in text:
+                assert parse_inline(text) == legacy_parse_inline(text), text
+        bench("regex parser (%d inlines)" % len(CORPUS), lambda: parse_corpus(legacy_parse_inline), number=2000)
+    bench("single pass parser (%d inlines)" % len(CORPUS), lambda: parse_corpus(parse_inline), number=2000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Benchmarks the whole inline pipeline over the corpora in `benchmarks.corpora`.
+
+Run it from the repository root::
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --json results.json
+    python -m benchmarks.suite --quick --seed 2
+
+For each corpus it reports throughput for cold caches (every text compiled
+and rendered from scratch) and warm ones, render time percentiles for each
+inline name, the database queries one pass makes and, where `tracemalloc` is
+available, peak memory. Save the JSON from two versions and diff them.
+
+It uses the test project's settings and sqlite database, creating the tables
+and the users that ModelInline corpora refer to if they're missing.
+"""
+import datetime
+import gc
+import optparse
+import platform
+import sys
+import time
+
+from benchmarks import setup_django
+setup_django()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, reset_queries
+import django
+
+from django_inlines.inlines import Registry, InlineBase, parse_inline
+from django_inlines.samples import YoutubeInline
+from django_inlines.stats import StatsCollector
+
+from benchmarks import corpora
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class EchoInline(InlineBase):
+    def render(self):
+        return self.value
+
+
+def setup_database(users):
+    """
+    Creates the test project's tables if needed and makes sure there are at
+    least `users` users. Returns their pks.
+    """
+    from core.models import User
+    call_command('syncdb', interactive=False, verbosity=0)
+    existing = User.objects.count()
+    for i in range(existing, users):
+        User.objects.create(name='Bench user %d' % i, email='bench%d@example.com' % i, phone='555-%04d' % i)
+    return list(User.objects.values_list('pk', flat=True).order_by('pk')[:users])
+
+
+def make_registry():
+    from core.tests.test_inlines import UserInline
+    registry = Registry()
+    registry.fragment_cache.use_django_cache = False
+    registry.register('youtube', YoutubeInline)
+    registry.register('echo', EchoInline)
+    registry.register('user', UserInline)
+    return registry
+
+
+def timed_pass(registry, texts, cold):
+    if cold:
+        registry.compiled_cache.invalidate()
+        registry.fragment_cache.invalidate()
+        if registry.template_cache is not None:
+            registry.template_cache.clear()
+    started = time.time()
+    for text in texts:
+        registry.process(text)
+    return time.time() - started
+
+
+def bench_corpus(registry, texts, repeat):
+    """
+    Returns the results for one corpus.
+    """
+    size = sum([len(text) for text in texts])
+    result = {'texts': len(texts), 'bytes': size}
+
+    for label, cold in (('cold', True), ('warm', False)):
+        timed_pass(registry, texts, cold)
+        best = min([timed_pass(registry, texts, cold) for i in range(repeat)])
+        result[label] = {
+            'seconds': round(best, 6),
+            'texts_per_second': round(len(texts) / best, 1),
+            'mb_per_second': round(size / best / 1e6, 3),
+        }
+
+    # Per inline render times, from a cold pass.
+    registry.stats = StatsCollector(publish_interval=None)
+    timed_pass(registry, texts, True)
+    inlines = {}
+    for name, stats in sorted(registry.stats.inlines.items()):
+        inlines[name] = {
+            'count': stats.count,
+            'errors': stats.error_count,
+            'mean_usec': round(stats.mean_time * 1e6, 1),
+            'p50_usec': round(stats.percentile(50) * 1e6, 1),
+            'p95_usec': round(stats.percentile(95) * 1e6, 1),
+            'p99_usec': round(stats.percentile(99) * 1e6, 1),
+        }
+    registry.stats = None
+    result['inlines'] = inlines
+
+    # Queries for one cold pass. Django only records them with DEBUG on.
+    debug = settings.DEBUG
+    settings.DEBUG = True
+    try:
+        reset_queries()
+        timed_pass(registry, texts, True)
+        result['queries'] = len(connection.queries)
+    finally:
+        settings.DEBUG = debug
+        reset_queries()
+
+    result['peak_memory_kb'] = None
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            timed_pass(registry, texts, True)
+            result['peak_memory_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def bench_parser(corpus, repeat):
+    """
+    Times `parse_inline` alone over every inline in the corpora.
+    """
+    registry = Registry()
+    sources = []
+    for name, texts in corpus:
+        for text in texts:
+            sources.extend([match.group(1) for match in registry.inline_finder.finditer(text)])
+    best = None
+    for i in range(repeat):
+        started = time.time()
+        for source in sources:
+            parse_inline(source)
+        elapsed = time.time() - started
+        if best is None or elapsed < best:
+            best = elapsed
+    return {'inlines': len(sources), 'usec_per_inline': round(best / max(len(sources), 1) * 1e6, 3)}
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage="python -m benchmarks.suite [options]")
+    parser.add_option('--seed', default='1', help="Seed for the corpora. Default: 1")
+    parser.add_option('--repeat', type='int', default=5, help="Timed passes per corpus; the best is kept. Default: 5")
+    parser.add_option('--users', type='int', default=500, help="Distinct users for ModelInline corpora. Default: 500")
+    parser.add_option('--quick', action='store_true', default=False, help="Use small corpora and fewer passes.")
+    parser.add_option('--only', default=None, help="Comma separated corpus names to run.")
+    parser.add_option('--json', dest='json', default=None, help="Write the results as JSON to this file, or - for stdout.")
+    options, args = parser.parse_args(argv)
+
+    if options.quick:
+        options.repeat = 1
+        options.users = min(options.users, 50)
+    pks = setup_database(options.users)
+    corpus = corpora.build(options.seed, pks)
+    if options.quick:
+        corpus = [(name, texts[:max(1, len(texts) // 10)]) for name, texts in corpus]
+    if options.only:
+        only = options.only.split(',')
+        corpus = [(name, texts) for name, texts in corpus if name in only]
+
+    results = {
+        'meta': {
+            'date': datetime.datetime.utcnow().replace(microsecond=0).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'seed': options.seed,
+            'repeat': options.repeat,
+            'users': len(pks),
+            'quick': options.quick,
+        },
+        'parse_inline': bench_parser(corpus, options.repeat),
+        'corpora': {},
+    }
+    registry = make_registry()
+    for name, texts in corpus:
+        results['corpora'][name] = bench_corpus(registry, texts, options.repeat)
+
+    if options.json:
+        from django.utils import simplejson
+        output = simplejson.dumps(results, indent=2, sort_keys=True)
+        if options.json == '-':
+            sys.stdout.write(output + '\n')
+        else:
+            out = open(options.json, 'w')
+            try:
+                out.write(output + '\n')
+            finally:
+                out.close()
+    if options.json != '-':
+        report(results)
+
+
+def report(results):
+    write = sys.stdout.write
+    meta = results['meta']
+    write("Python %(python)s, Django %(django)s, seed %(seed)s, best of %(repeat)d\n\n" % meta)
+    write("parse_inline: %(usec_per_inline).3f usec/inline over %(inlines)d inlines\n\n" % results['parse_inline'])
+    for name, result in sorted(results['corpora'].items()):
+        write("%s: %d texts, %d bytes, %d queries" % (name, result['texts'], result['bytes'], result['queries']))
+        if result['peak_memory_kb'] is not None:
+            write(", peak %d KB" % result['peak_memory_kb'])
+        write("\n")
+        for label in ('cold', 'warm'):
+            write("  %-5s %10.1f texts/s %8.3f MB/s\n" % (label, result[label]['texts_per_second'], result[label]['mb_per_second']))
+        for inline, stats in sorted(result['inlines'].items()):
+            write("  %-10s %6d renders  p50 %8.1f  p95 %8.1f  p99 %8.1f usec\n" % (
+                inline, stats['count'], stats['p50_usec'], stats['p95_usec'], stats['p99_usec']))
+        write("\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,5 @@ from django.conf.urls.defaults import *
 urlpatterns = patterns('django_inlines.views',
     url(r'^inline_config\.js$', 'js_inline_config', name='js_inline_config'),
     url(r'^get_inline_form/$', 'get_inline_form', name='get_inline_form'),
+    url(r'^inline_schemas\.json$', 'inline_schemas', name='inline_schemas'),
 )
@@ -0,0 +1,317 @@
+"""
+Caches used by the inline registry.
+"""
+import itertools
+import threading
+import time
+from django.core.cache import cache as django_cache
+from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
+
+_version_counter = itertools.count()
+
+
+class LRUCache(object):
+    """
+    A small thread safe mapping that holds at most `max_size` items, evicting
+    the least recently used one when it's full. It counts hits and misses.
+    """
+
+    # Indexes into the [prev, next, key, value] lists that make up the
+    # circular linked list of entries.
+    PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._map = {}
+            self._root = root = []
+            root[:] = [root, root, None, None]
+            self.hits = 0
+            self.misses = 0
+        finally:
+            self._lock.release()
+
+    def __len__(self):
+        return len(self._map)
+
+    def __contains__(self, key):
+        return key in self._map
+
+    def _move_to_end(self, link):
+        # Unlink the entry and put it back at the most recently used end.
+        link_prev, link_next = link[self.PREV], link[self.NEXT]
+        link_prev[self.NEXT] = link_next
+        link_next[self.PREV] = link_prev
+        root = self._root
+        last = root[self.PREV]
+        last[self.NEXT] = root[self.PREV] = link
+        link[self.PREV] = last
+        link[self.NEXT] = root
+
+    def get(self, key, default=None):
+        self._lock.acquire()
+        try:
+            link = self._map.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._move_to_end(link)
+            return link[self.VALUE]
+        finally:
+            self._lock.release()
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        self._lock.acquire()
+        try:
+            root = self._root
+            link = self._map.get(key)
+            if link is not None:
+                link[self.VALUE] = value
+                self._move_to_end(link)
+                return
+            if len(self._map) >= self.max_size:
+                # Reuse the root as the new entry and make the oldest entry
+                # the new root.
+                oldroot = root
+                oldroot[self.KEY] = key
+                oldroot[self.VALUE] = value
+                self._root = root = oldroot[self.NEXT]
+                del self._map[root[self.KEY]]
+                root[self.KEY] = root[self.VALUE] = None
+                self._map[key] = oldroot
+            else:
+                last = root[self.PREV]
+                link = [last, root, key, value]
+                last[self.NEXT] = root[self.PREV] = self._map[key] = link
+        finally:
+            self._lock.release()
+
+    def delete(self, key):
+        self._lock.acquire()
+        try:
+            link = self._map.pop(key, None)
+            if link is not None:
+                link_prev, link_next = link[self.PREV], link[self.NEXT]
+                link_prev[self.NEXT] = link_next
+                link_next[self.PREV] = link_prev
+        finally:
+            self._lock.release()
+
+
+class CompiledCache(object):
+    """
+    Holds compiled content for a `Registry`, keyed by a hash of the raw text
+    and the registry's START_TAG and END_TAG.
+
+    Compiled objects are kept in an in-process `LRUCache`. If `use_django_cache`
+    is True the parsed (but not yet registry-linked) nodes are also written
+    through to Django's cache framework so other processes can skip parsing.
+    """
+
+    key_prefix = 'django_inlines.compiled.2'
+
+    def __init__(self, max_size=1000, use_django_cache=False, timeout=None):
+        self.local = LRUCache(max_size)
+        self.use_django_cache = use_django_cache
+        self.timeout = timeout
+
+    def make_key(self, text, start_tag, end_tag):
+        digest = md5_constructor()
+        digest.update(smart_str(start_tag))
+        digest.update('\0')
+        digest.update(smart_str(end_tag))
+        digest.update('\0')
+        digest.update(smart_str(text))
+        return '%s.%s' % (self.key_prefix, digest.hexdigest())
+
+    def get(self, key):
+        return self.local.get(key)
+
+    def set(self, key, compiled):
+        self.local.set(key, compiled)
+
+    def get_parsed(self, key):
+        if not self.use_django_cache:
+            return None
+        return django_cache.get(key)
+
+    def set_parsed(self, key, parsed):
+        if self.use_django_cache:
+            if self.timeout is None:
+                django_cache.set(key, parsed)
+            else:
+                django_cache.set(key, parsed, self.timeout)
+
+    def invalidate(self):
+        """
+        Drops every compiled object held in process. Entries in Django's cache
+        don't refer to registered classes so they stay valid.
+        """
+        self.local.clear()
+
+    @property
+    def hits(self):
+        return self.local.hits
+
+    @property
+    def misses(self):
+        return self.local.misses
+
+
+class FragmentCache(object):
+    """
+    Holds the rendered output of inlines marked as `cacheable`, keyed by the
+    inline's class, name, value, variant, arguments and the template_dir it was
+    rendered with.
+
+    Output is kept in an in-process `LRUCache` and, if `use_django_cache` is
+    True, in Django's cache framework too. `version` is part of every key, so
+    changing it, for example on each release, leaves behind the fragments in
+    Django's cache that older code or templates rendered.
+
+    Fragments that depend on a database object, given as a (model, pk) pair,
+    are remembered so `evict` can drop just those fragments when the object
+    changes. With Django's cache the pair's current version is part of the key,
+    so `evict` in one process makes the fragments stale in all of them.
+    """
+
+    key_prefix = 'django_inlines.fragment.1'
+    version_prefix = 'django_inlines.fragment_version.1'
+
+    def __init__(self, max_size=1000, use_django_cache=False, version=''):
+        self.local = LRUCache(max_size)
+        self.use_django_cache = use_django_cache
+        self.version = version
+        self.dependents = {}
+        self._lock = threading.Lock()
+
+    def make_key(self, call, template_dir, depends_on=None):
+        cls = call.cls
+        digest = md5_constructor()
+        digest.update(smart_str(repr((self.version, cls.__module__, cls.__name__, call.key, template_dir))))
+        if depends_on is not None:
+            digest.update('\0')
+            digest.update(smart_str(self.get_version(depends_on)))
+        return '%s.%s' % (self.key_prefix, digest.hexdigest())
+
+    def make_version_key(self, depends_on):
+        model, pk = depends_on
+        return '%s.%s.%s.%s' % (self.version_prefix, model._meta.app_label, model._meta.module_name, pk)
+
+    def get_version(self, depends_on):
+        """
+        Returns the current version of a (model, pk) pair. Versions are only
+        kept in Django's cache; without it fragments are evicted in process.
+        """
+        if not self.use_django_cache:
+            return ''
+        version_key = self.make_version_key(depends_on)
+        version = django_cache.get(version_key)
+        if version is None:
+            django_cache.add(version_key, new_version())
+            version = django_cache.get(version_key)
+        return version
+
+    def get(self, key, timeout=None):
+        """
+        Returns the cached output or None. Output found in Django's cache is
+        copied to the in-process cache for `timeout` seconds.
+        """
+        entry = self.local.get(key)
+        if entry is not None:
+            expires, output = entry
+            if expires is None or expires > time.time():
+                return output
+            self.local.delete(key)
+        if self.use_django_cache:
+            output = django_cache.get(key)
+            if output is not None:
+                self.set_local(key, output, timeout)
+            return output
+        return None
+
+    def set_local(self, key, output, timeout=None):
+        expires = None
+        if timeout is not None:
+            expires = time.time() + timeout
+        self.local.set(key, (expires, output))
+
+    def set(self, key, output, timeout=None, depends_on=None):
+        self.set_local(key, output, timeout)
+        if self.use_django_cache:
+            if timeout is None:
+                django_cache.set(key, output)
+            else:
+                django_cache.set(key, output, timeout)
+        if depends_on is not None:
+            self.add_dependent(depends_on, key)
+
+    def add_dependent(self, depends_on, key):
+        model, pk = depends_on
+        self._lock.acquire()
+        try:
+            if len(self.dependents) > self.local.max_size:
+                # Forget keys the LRU has already dropped.
+                for dependency, keys in list(self.dependents.items()):
+                    keys = set([k for k in keys if k in self.local])
+                    if keys:
+                        self.dependents[dependency] = keys
+                    else:
+                        del self.dependents[dependency]
+            self.dependents.setdefault((model, pk), set()).add(key)
+        finally:
+            self._lock.release()
+
+    def evict(self, model, pk):
+        """
+        Drops every fragment that depends on the object of class `model` with
+        primary key `pk`.
+        """
+        self._lock.acquire()
+        try:
+            keys = self.dependents.pop((model, pk), ())
+        finally:
+            self._lock.release()
+        for key in keys:
+            self.local.delete(key)
+        if self.use_django_cache:
+            django_cache.set(self.make_version_key((model, pk)), new_version())
+            for key in keys:
+                django_cache.delete(key)
+
+    def invalidate(self):
+        """
+        Drops every fragment held in process. Fragments in Django's cache are
+        only left behind by changing `version`.
+        """
+        self.local.clear()
+        self._lock.acquire()
+        try:
+            self.dependents.clear()
+        finally:
+            self._lock.release()
+
+    @property
+    def hits(self):
+        return self.local.hits
+
+    @property
+    def misses(self):
+        return self.local.misses
+
+
+def new_version():
+    """
+    Returns a version string that hasn't been used before. It's never reused
+    even if the previous one expired from the cache.
+    """
+    return '%x.%x' % (int(time.time() * 1000000), next(_version_counter))
@@ -1,10 +1,22 @@
+from django import forms
+from django.conf import settings
 from django.db import models
+from django.db.models import signals
 from django.contrib.admin.widgets import AdminTextareaWidget
+from django.utils.functional import curry
+from django.utils.safestring import mark_safe
+
+from django_inlines import inlines
 
 
 class DelayedUrlReverse(object):
-    def __init__(self, reverse_arg):
+    """
+    A URL that's only reversed when it's used. `version`, if given, is a
+    callable returning a string added to the URL as ``?v=``.
+    """
+    def __init__(self, reverse_arg, version=None):
         self.reverse_arg = reverse_arg
+        self.version = version
 
     def __str__(self):
         from django.core.urlresolvers import reverse, NoReverseMatch
@@ -12,12 +24,19 @@ class DelayedUrlReverse(object):
             url = reverse(self.reverse_arg)
         except NoReverseMatch:
             url = ''
+        if url and self.version is not None:
+            url = '%s?v=%s' % (url, self.version())
         return url
 
     def startswith(self, value):
         return str(self).startswith(value)
 
 
+def js_inline_config_version():
+    from django_inlines.views import js_inline_config_version
+    return js_inline_config_version()
+
+
 class InlineWidget(AdminTextareaWidget):
     def __init__(self, attrs=None):
         final_attrs = {'class': 'vLargeTextField vInlineTextArea'}
@@ -30,16 +49,159 @@ class InlineWidget(AdminTextareaWidget):
 
         js = [
                 'admin/jquery.js',
-                DelayedUrlReverse('js_inline_config'),
+                DelayedUrlReverse('js_inline_config', version=js_inline_config_version),
                 'js/admin/RelatedObjectLookups.js',
                 'django_inlines/jquery-fieldselection.js',
                 'django_inlines/inlines.js'
             ]
 
 
+class InlineFormField(forms.CharField):
+    """
+    A form field for text containing inlines. Every inline is checked with
+    `Registry.validate`, so text with unregistered names, unknown variants or
+    arguments, or model inlines for missing objects isn't accepted, and the
+    cleaned text has its inlines normalized.
+    """
+    widget = InlineWidget
+
+    def clean(self, value):
+        value = super(InlineFormField, self).clean(value)
+        if not value:
+            return value
+        registry = inlines.registry
+        errors = registry.validate(value)
+        if errors:
+            raise forms.ValidationError([u'%s %s %s: %s' % (registry.START_TAG, node.source, registry.END_TAG, message)
+                                         for node, message in errors])
+        return registry.normalize(value)
+
+
+# Every InlineField that keeps a rendered copy, as (model, field) pairs.
+rendered_inline_fields = []
+
+# Every InlineField, as (model, field) pairs.
+inline_fields = []
+
+
+def index_enabled():
+    return getattr(settings, 'INLINES_OCCURRENCE_INDEX', False)
+
+
 class InlineField(models.TextField):
+    """
+    A TextField for text containing inlines.
+
+    Given `rendered_field`, the name of another text field on the same model
+    that allows NULL, the processed text is stored in that field every time
+    the model is saved and can be read back with ``get_<name>_rendered()``
+    without processing anything. When an object used by a model inline in the
+    text is saved or deleted the stored copy is set to NULL and rendered again
+    the next time it's asked for.
+
+    The text is processed without a template context.
+
+    The inlines in the text are indexed as `InlineOccurrence` objects every
+    time the model is saved if the field keeps a rendered copy, which needs
+    the index to find the copies to clear, or INLINES_OCCURRENCE_INDEX is on.
+
+    Its form field is an `InlineFormField`, which checks and normalizes the
+    inlines, unless `validate_inlines` is False.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.rendered_field = kwargs.pop('rendered_field', None)
+        self.validate_inlines = kwargs.pop('validate_inlines', True)
+        super(InlineField, self).__init__(*args, **kwargs)
+
+    def contribute_to_class(self, cls, name):
+        super(InlineField, self).contribute_to_class(cls, name)
+        inline_fields.append((cls, self))
+        signals.post_save.connect(self.update_index, sender=cls)
+        signals.post_delete.connect(self.delete_index, sender=cls)
+        if self.rendered_field:
+            rendered_inline_fields.append((cls, self))
+            setattr(cls, 'get_%s_rendered' % self.name, curry(get_rendered, field=self))
+            signals.pre_save.connect(self.update_rendered, sender=cls)
+
+    def render(self, value):
+        if not value:
+            return ''
+        return inlines.registry.process(value)
+
+    def update_rendered(self, instance, **kwargs):
+        setattr(instance, self.rendered_field, self.render(getattr(instance, self.attname)))
+
+    def is_indexed(self):
+        return bool(self.rendered_field) or index_enabled()
+
+    def update_index(self, instance, **kwargs):
+        if self.is_indexed():
+            from django_inlines.models import InlineOccurrence
+            InlineOccurrence.objects.index(instance, self)
+
+    def delete_index(self, instance, **kwargs):
+        if self.is_indexed():
+            from django_inlines.models import InlineOccurrence
+            InlineOccurrence.objects.for_document(instance, self.name).delete()
+
     def formfield(self, **kwargs):
         defaults = {}
+        if self.validate_inlines:
+            defaults['form_class'] = InlineFormField
         defaults.update(kwargs)
-        defaults = {'widget': InlineWidget}
-        return super(InlineField, self).formfield(**defaults)
\ No newline at end of file
+        # The admin asks for its plain textarea for every TextField.
+        if defaults.get('widget') in (None, AdminTextareaWidget):
+            defaults['widget'] = InlineWidget
+        return super(InlineField, self).formfield(**defaults)
+
+
+def get_rendered(instance, field):
+    """
+    Returns the stored rendered copy of an InlineField, rendering and storing
+    it again first if it's been cleared.
+    """
+    value = getattr(instance, field.attname)
+    rendered = getattr(instance, field.rendered_field)
+    if rendered is None:
+        rendered = field.render(value)
+        setattr(instance, field.rendered_field, rendered)
+        if instance.pk is not None:
+            instance.__class__._default_manager.filter(pk=instance.pk).update(**{field.rendered_field: rendered})
+    return mark_safe(rendered)
+
+
+def find_dependents(target):
+    """
+    Returns a {(model, field): [pk, ...]} mapping of the objects with a
+    rendered InlineField that uses `target`, a (model, pk) pair, in a model
+    inline. They're looked up in the occurrence index with one query.
+    """
+    from django_inlines.models import InlineOccurrence, model_label, to_pk
+    fields = dict([((model_label(model), field.name), (model, field)) for model, field in rendered_inline_fields])
+    dependents = {}
+    occurrences = InlineOccurrence.objects.for_key(*target).values_list('document_type', 'field', 'document_id')
+    for document_type, field_name, document_id in occurrences:
+        found = fields.get((document_type, field_name))
+        if found is not None:
+            document_id = to_pk(found[0], document_id)
+            pks = dependents.setdefault(found, [])
+            if document_id not in pks:
+                pks.append(document_id)
+    return dependents
+
+
+def clear_dependent_renders(sender, instance, **kwargs):
+    """
+    Clears the rendered copy of every InlineField whose text uses `instance`
+    in a model inline.
+    """
+    if not rendered_inline_fields:
+        return
+    if not inlines.registry.names_for_model(sender):
+        return
+    for (model, field), pks in find_dependents((sender, instance.pk)).items():
+        model._default_manager.filter(pk__in=pks).update(**{field.rendered_field: None})
+
+signals.post_save.connect(clear_dependent_renders, dispatch_uid='django_inlines.clear_dependent_renders')
+signals.post_delete.connect(clear_dependent_renders, dispatch_uid='django_inlines.clear_dependent_renders')
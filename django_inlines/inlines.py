@@ -1,18 +1,30 @@
+import copy
+import operator
 import re
-from django.template.loader import render_to_string
-from django.template import Context, RequestContext
+import string
+import sys
+import threading
+import time
+from django.template.loader import select_template
+from django.template import Context, RequestContext, TemplateDoesNotExist
+from django.db import connection
 from django.db.models.base import ModelBase
+from django.db.models import signals
 from django.conf import settings
+from django_inlines.cache import LRUCache, CompiledCache, FragmentCache
+from django_inlines.signals import inline_rendered
+from django_inlines.stats import StatsCollector, query_count
+try:
+    from concurrent import futures
+except ImportError:
+    # Threaded rendering needs Python 3.2 or the `futures` backport.
+    futures = None
 
-INLINE_SPLITTER = re.compile(r"""
-    (?P<name>[a-z_]+)       # Must start with a lowercase + underscores name
-    (?::(?P<variant>\w+))?  # Variant is optional, ":variant"
-    (?:(?P<args>[^\Z]+))? # args is everything up to the end
-    """, re.VERBOSE)
-
-INLINE_KWARG_PARSER = re.compile(r"""
-    (?P<kwargs>(?:\s\b[a-z_]+=\w+\s?)+)?\Z # kwargs match everything at the end in groups " name=arg"
-    """, re.VERBOSE)
+# Characters allowed in inline and argument names, in variants and argument
+# values (like the regex \w), and that separate arguments.
+NAME_CHARS = frozenset(string.ascii_lowercase + '_')
+WORD_CHARS = frozenset(string.ascii_letters + string.digits + '_')
+WHITESPACE = frozenset(' \t\n\r\f\v')
 
 
 class InlineUnrenderableError(Exception):
@@ -37,35 +49,287 @@ class InlineNotRegisteredError(InlineUnrenderableError):
 class InlineUnparsableError(InlineUnrenderableError):
     pass
 
+class InlineTimeoutError(InlineUnrenderableError):
+    pass
+
+class InlineBudgetError(InlineUnrenderableError):
+    pass
+
 
 def parse_inline(text):
     """
     Takes a string of text from a text inline and returns a 3 tuple of
     (name, value, **kwargs).
+
+    The text is scanned once: a lowercase name, an optional ":variant", then
+    the value, followed by any number of " name=arg" pairs at the end.
     """
 
-    m = INLINE_SPLITTER.match(text)
-    if not m:
+    length = len(text)
+    pos = 0
+    while pos < length and text[pos] in NAME_CHARS:
+        pos += 1
+    if not pos:
         raise InlineUnparsableError
-    args = m.group('args')
-    name = m.group('name')
-    value = ""
-    kwtxt = ""
+    name = text[:pos]
     kwargs = {}
-    if args:
-        kwtxt = INLINE_KWARG_PARSER.search(args).group('kwargs')
-        value = re.sub("%s\Z" % kwtxt, "", args)
-        value = value.strip()
-    if m.group('variant'):
-        kwargs['variant'] = m.group('variant')
-    if kwtxt:
-        for kws in kwtxt.split():
-            k, v = kws.split('=')
-            kwargs[str(k)] = v
+
+    if pos < length and text[pos] == ':':
+        end = pos + 1
+        while end < length and text[end] in WORD_CHARS:
+            end += 1
+        if end > pos + 1:
+            kwargs['variant'] = text[pos + 1:end]
+            pos = end
+
+    # Walk backwards over whitespace separated words for as long as they look
+    # like " name=arg". Whatever is left before them is the value.
+    pairs = []
+    value_end = length
+    while True:
+        end = value_end
+        while end > pos and text[end - 1] in WHITESPACE:
+            end -= 1
+        start = end
+        while start > pos and text[start - 1] not in WHITESPACE:
+            start -= 1
+        if start == end or start == pos or not is_inline_kwarg(text, start, end):
+            break
+        pairs.append((start, end))
+        value_end = start
+
+    value = text[pos:value_end].strip()
+    for start, end in reversed(pairs):
+        k, v = text[start:end].split('=')
+        kwargs[str(k)] = v
     return (name, value, kwargs)
 
 
-def inline_for_model(model, variants=[], inline_args={}):
+class ParsedInline(tuple):
+    """
+    One inline found in a text: the raw `source` between the tags and its
+    parsed `name`, `value`, `variant` and `kwargs`, a sorted tuple of
+    (name, value) pairs. `name` is None if the source couldn't be parsed.
+    `text` is the whole inline as it was matched, tags included, if it's
+    known.
+
+    It's an immutable tuple without a per-instance dictionary, so compiled and
+    cached content stays small, and it pickles for Django's cache.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, source, name=None, value="", variant=None, kwargs=(), text=None):
+        return tuple.__new__(cls, (source, name, value, variant, kwargs, text))
+
+    def __reduce__(self):
+        return (ParsedInline, tuple(self))
+
+    def __repr__(self):
+        return 'ParsedInline(%r, %r, %r, %r, %r, %r)' % tuple(self)
+
+    source = property(operator.itemgetter(0))
+    name = property(operator.itemgetter(1))
+    value = property(operator.itemgetter(2))
+    variant = property(operator.itemgetter(3))
+    kwargs = property(operator.itemgetter(4))
+    text = property(operator.itemgetter(5))
+
+    @classmethod
+    def from_source(cls, source, text=None):
+        """
+        Parses the text of an inline with `parse_inline`. `text` is the whole
+        match the source was taken from.
+        """
+        try:
+            name, value, kwargs = parse_inline(source)
+        except InlineUnparsableError:
+            return cls(source, text=text)
+        variant = kwargs.pop('variant', None)
+        return cls(source, name, value, variant, tuple(sorted(kwargs.items())), text)
+
+    def normalized(self):
+        """
+        Returns the inline's text in one standard form: single spaces between
+        the parts and the arguments in alphabetical order. It parses to the
+        same name, value, variant and arguments.
+        """
+        name = self.name
+        if self.variant:
+            name = '%s:%s' % (name, self.variant)
+        bits = [name]
+        if self.value:
+            bits.append(self.value)
+        bits.extend(['%s=%s' % pair for pair in self.kwargs])
+        return ' '.join(bits)
+
+
+def is_inline_kwarg(text, start, end):
+    """
+    Returns True if text[start:end] is a "name=arg" pair.
+    """
+    equals = text.find('=', start, end)
+    if equals <= start or equals == end - 1:
+        return False
+    for i in range(start, equals):
+        if text[i] not in NAME_CHARS:
+            return False
+    for i in range(equals + 1, end):
+        if text[i] not in WORD_CHARS:
+            return False
+    return True
+
+
+# Template directories by the template_dir they were made from. They're the
+# same for every inline rendered with it, so they're only cleaned up once.
+_template_dirs = LRUCache(100)
+
+def get_template_dirs(template_dir):
+    """
+    Returns a new list of the directories a TemplateInline looks for its
+    template in: the cleaned up `template_dir`, if there is one, then
+    ``inlines``.
+    """
+    dirs = _template_dirs.get(template_dir)
+    if dirs is None:
+        dirs = []
+        if template_dir:
+            dirs.append(template_dir.strip('/').replace("'", '').replace('"', ''))
+        dirs.append('inlines')
+        dirs = tuple(dirs)
+        _template_dirs.set(template_dir, dirs)
+    return list(dirs)
+
+
+def isolate_context(context):
+    """
+    Returns a copy of a template context with its own stack of dictionaries,
+    so it can be pushed and popped without affecting the original.
+    """
+    if context is None:
+        return None
+    isolated = copy.copy(context)
+    isolated.dicts = context.dicts[:]
+    return isolated
+
+
+class ThreadedRender(object):
+    """
+    A call handed to the thread pool by `Registry.submit_threaded`.
+
+    It's 'queued' until a worker starts it, 'running' until it's rendered,
+    then 'done'. The render timeout starts when a worker picks it up, which
+    sets `picked_up`. A queued call can be taken back and rendered by the
+    thread that asked for it. A running call that's given up on is 'timed_out' and counted in the
+    registry's `hung_renders` until its worker returns. The state is changed
+    under a lock, so each render ends exactly one way and is recorded once.
+    """
+
+    __slots__ = ('registry', 'call', 'timeout', 'future', 'started', 'state', 'lock', 'picked_up')
+
+    def __init__(self, registry, call, timeout):
+        self.registry = registry
+        self.call = call
+        self.timeout = timeout
+        self.future = None
+        self.started = None
+        self.state = 'queued'
+        self.lock = threading.Lock()
+        self.picked_up = threading.Event()
+
+    def _change(self, expected, state):
+        self.lock.acquire()
+        try:
+            previous = self.state
+            if previous in expected:
+                self.state = state
+                if state == 'running':
+                    self.started = time.time()
+            return previous
+        finally:
+            self.lock.release()
+
+    def start(self):
+        """
+        Called by the worker. Returns False if the call was taken back.
+        """
+        started = self._change(('queued',), 'running') == 'queued'
+        self.picked_up.set()
+        return started
+
+    def finish(self):
+        """
+        Called by the worker when it's done. Returns False if the render was
+        timed out in the meantime.
+        """
+        previous = self._change(('running', 'timed_out'), 'done')
+        if previous == 'timed_out':
+            self.registry.count_hung(-1)
+        return previous == 'running'
+
+    def take_back(self):
+        """
+        Returns True if no worker had started the call, which it now never
+        will.
+        """
+        return self._change(('queued',), 'done') == 'queued'
+
+    def time_out(self):
+        """
+        Returns True if the call was still running and is now timed out.
+        """
+        timed_out = self._change(('running',), 'timed_out') == 'running'
+        if timed_out:
+            self.registry.count_hung(1)
+        return timed_out
+
+
+class RenderBudget(object):
+    """
+    Limits on how much rendering one document may do: how many inlines it may
+    contain, how many seconds its inlines may take and how long its output
+    may get. `None` means no limit.
+
+    The time limit is checked before each inline is started, so a single slow
+    inline isn't interrupted; the inlines after it are skipped.
+    """
+
+    def __init__(self, max_inlines=None, max_time=None, max_output=None):
+        self.max_inlines = max_inlines
+        self.max_time = max_time
+        self.max_output = max_output
+        self.inlines = 0
+        self.output = 0
+        self.started = time.time()
+
+    def remaining_inlines(self):
+        if self.max_inlines is None:
+            return None
+        return max(0, self.max_inlines - self.inlines)
+
+    def start_inline(self):
+        """
+        Counts an inline that's about to be rendered. Raises an
+        InlineBudgetError if the document has run out of budget.
+        """
+        if self.max_inlines is not None and self.inlines >= self.max_inlines:
+            raise InlineBudgetError("Documents may contain at most %d inlines" % self.max_inlines)
+        if self.max_time is not None and time.time() - self.started > self.max_time:
+            raise InlineBudgetError("Inlines took longer than %s seconds to render" % self.max_time)
+        self.inlines += 1
+
+    def add_output(self, output, inline=True):
+        """
+        Counts rendered output. Raises an InlineBudgetError if output from an
+        inline would make the document longer than `max_output`. Literal text
+        is always counted and never refused.
+        """
+        if inline and self.max_output is not None and self.output + len(output) > self.max_output:
+            raise InlineBudgetError("Rendered output may be at most %d characters long" % self.max_output)
+        self.output += len(output)
+
+
+def inline_for_model(model, variants=[], inline_args={}, cacheable=False, cache_timeout=None):
     """
     A shortcut function to produce ModelInlines for django models
     """
@@ -76,7 +340,11 @@ def inline_for_model(model, variants=[], inline_args={}):
     if variants:
         d['variants'] = variants
     if inline_args:
-        d['args'] = inline_args
+        d['inline_args'] = inline_args
+    if cacheable:
+        d['cacheable'] = True
+        d['cache_timeout'] = cache_timeout
+    d['__slots__'] = ()
     class_name = "%sInline" % model._meta.module_name.capitalize()
     return type(class_name, (ModelInline,), d)
 
@@ -86,8 +354,26 @@ class InlineBase(object):
     A base class for overriding to provide simple inlines.
     The `render` method is the only required override. It should return a string.
     or at least something that can be coerced into a string.
+
+    Set `cacheable` to True if the output only depends on the inline's value,
+    variant and arguments. Its rendered output will be cached for
+    `cache_timeout` seconds and it will never be given the template context.
+
+    Set `threaded` to True for inlines that spend their time waiting on other
+    services. They'll be rendered in the registry's thread pool alongside the
+    other inlines in the text and given up on after `render_timeout` seconds.
+
+    Instances only have slots. Subclasses that don't add attributes can set
+    ``__slots__ = ()`` to stay that way and use less memory.
     """
 
+    __slots__ = ('value', 'variant', 'kwargs')
+
+    cacheable = False
+    cache_timeout = None
+    threaded = False
+    render_timeout = None
+
     def __init__(self, value, variant=None, context=None, template_dir="", **kwargs):
         self.value = value
         self.variant = variant
@@ -108,18 +394,41 @@ class TemplateInline(object):
 
     Any extra arguments assigned to your inline are passed directly though to
     the context.
+
+    Set `inherit_context` to a list of keys to only pass those keys of the
+    parent context through.
+
+    Set `cacheable` to True if the output only depends on the inline's value,
+    variant and arguments. Its rendered output will be cached for
+    `cache_timeout` seconds and its template won't see the template context.
+
+    Set `threaded` to True for inlines that spend their time waiting on other
+    services. They'll be rendered in the registry's thread pool alongside the
+    other inlines in the text and given up on after `render_timeout` seconds.
+
+    Instances only have slots. Subclasses that don't add attributes can set
+    ``__slots__ = ()`` to stay that way and use less memory.
     """
 
+    __slots__ = ('value', 'variant', 'context', 'kwargs', 'template_dirs', 'template_cache')
+
+    cacheable = False
+    cache_timeout = None
+    threaded = False
+    render_timeout = None
+
+    # The keys of the parent template context the inline's template can see.
+    # None means all of them. A list of keys gives the template a small flat
+    # context with just those, which is quicker to render on inline heavy
+    # pages.
+    inherit_context = None
+
     def __init__(self, value, variant=None, context=None, template_dir=None, **kwargs):
         self.value = value
         self.variant = variant
         self.context = context
         self.kwargs = kwargs
-
-        self.template_dirs = []
-        if template_dir:
-            self.template_dirs.append(template_dir.strip('/').replace("'", '').replace('"', ''))
-        self.template_dirs.append('inlines')
+        self.template_dirs = get_template_dirs(template_dir)
 
     def get_context(self):
         """
@@ -136,16 +445,61 @@ class TemplateInline(object):
             templates.append('%s/%s.html' % (dir, name))
         return templates
 
+    def get_template(self):
+        """
+        Returns the first template from `get_template_name` that exists. If a
+        `template_cache` is set the result, or the lack of one, is remembered
+        so the template loaders aren't asked again.
+        """
+        # `template_cache` remembers which template was found for each (class,
+        # name, template_dirs, variant). `Registry` sets it to its own
+        # `template_cache`.
+        cache = getattr(self, 'template_cache', None)
+        if cache is None:
+            return select_template(self.get_template_name())
+        key = (self.__class__, self.__class__.name, tuple(self.template_dirs), self.variant)
+        template = cache.get(key)
+        if template is None:
+            template_names = self.get_template_name()
+            try:
+                template = select_template(template_names)
+            except TemplateDoesNotExist:
+                template = TemplateDoesNotExist(', '.join(template_names))
+            cache.set(key, template)
+        if isinstance(template, TemplateDoesNotExist):
+            raise template
+        return template
+
+    def get_render_context(self, inline_context):
+        """
+        Returns the context the template is rendered with: the inline's
+        arguments, `variant` and `inline_context` in one layer on top of the
+        parent context, or on top of just the keys of it named in
+        `inherit_context`. The parent context isn't changed.
+        """
+        layer = dict(self.kwargs)
+        layer['variant'] = self.variant
+        layer.update(inline_context)
+        parent = self.context
+        if not parent:
+            return Context(layer)
+        if self.inherit_context is None:
+            context = isolate_context(parent)
+            context.update(layer)
+            return context
+        flat = {}
+        for key in self.inherit_context:
+            try:
+                flat[key] = parent[key]
+            except KeyError:
+                pass
+        flat.update(layer)
+        return Context(flat, autoescape=parent.autoescape)
+
     def render(self):
-        if self.context:
-            context = self.context
-        else:
-            context = Context()
-        context.update(self.kwargs)
-        context['variant'] = self.variant
-        output = render_to_string(self.get_template_name(), self.get_context(), context)
-        context.pop()
-        return output
+        inline_context = self.get_context()
+        template = self.get_template()
+        return template.render(self.get_render_context(inline_context))
 
 
 class ModelInline(TemplateInline):
@@ -153,8 +507,16 @@ class ModelInline(TemplateInline):
     A base class for creating inlines for Django models. The `model` class
     attribute is the only required override. It should be assigned a django
     model class.
+
+    Cacheable model inlines are evicted from the fragment cache whenever their
+    object is saved or deleted.
     """
 
+    # `preloaded_objects` is a {pk: object} mapping of objects loaded ahead of
+    # time by `Registry.prefetch`. When it's set `get_object` won't query the
+    # database.
+    __slots__ = ('preloaded_objects',)
+
     model = None
     help_text = "Takes the id of the desired object"
 
@@ -162,62 +524,834 @@ class ModelInline(TemplateInline):
     def get_app_label(self):
         return "%s/%s" % (self.model._meta.app_label, self.model._meta.module_name)
 
-    def get_context(self):
+    @classmethod
+    def object_key(cls, value):
+        """
+        Returns the (model, pk) pair an inline with this value refers to, or
+        None if the value can't refer to an object.
+        """
+        if not isinstance(cls.model, ModelBase):
+            return None
+        try:
+            return (cls.model, int(value))
+        except ValueError:
+            return None
+
+    def get_object(self):
         model = self.__class__.model
         if not isinstance(model, ModelBase):
             raise InlineAttributeError('ModelInline requires model to be set to a django model class')
         try:
             value = int(self.value)
-            object = model.objects.get(pk=value)
+            preloaded_objects = getattr(self, 'preloaded_objects', None)
+            if preloaded_objects is not None:
+                try:
+                    return preloaded_objects[value]
+                except KeyError:
+                    raise model.DoesNotExist
+            return model.objects.get(pk=value)
         except ValueError:
             raise InlineInputError("'%s' could not be converted to an int" % self.value)
         except model.DoesNotExist:
             raise InlineInputError("'%s' could not be found in %s.%s" % (self.value, model._meta.app_label, model._meta.module_name))
-        return { 'object': object }
+
+    def get_context(self):
+        return { 'object': self.get_object() }
+
+
+class RegisteredInline(object):
+    """
+    An inline class as registered with a `Registry` under `name`, with the
+    class attributes rendering needs looked up once, when it's registered.
+    Change an inline's attributes before registering it.
+    """
+
+    __slots__ = ('name', 'cls', 'cacheable', 'cache_timeout', 'threaded', 'render_timeout',
+                 'model', 'object_key', 'is_template_inline')
+
+    def __init__(self, name, cls):
+        self.name = name
+        self.cls = cls
+        self.cacheable = bool(getattr(cls, 'cacheable', False))
+        self.cache_timeout = getattr(cls, 'cache_timeout', None)
+        self.threaded = bool(getattr(cls, 'threaded', False))
+        self.render_timeout = getattr(cls, 'render_timeout', None)
+        self.model = getattr(cls, 'model', None)
+        self.object_key = getattr(cls, 'object_key', None)
+        self.is_template_inline = isinstance(cls, type) and issubclass(cls, TemplateInline)
+
+    def build(self, call, context=None, template_dir=None, objects=None, template_cache=None):
+        """
+        Makes the inline instance that renders `call`.
+        """
+        inline = self.cls(call.value, variant=call.variant, context=context, template_dir=template_dir, **call.get_kwargs())
+        if objects and self.model is not None and self.model in objects:
+            inline.preloaded_objects = objects[self.model]
+        if template_cache is not None and self.is_template_inline:
+            inline.template_cache = template_cache
+        return inline
+
+
+class RegistrySnapshot(object):
+    """
+    The inlines registered with a `Registry` at one point in time, as a
+    {name: RegisteredInline} mapping in `inlines`.
+
+    Snapshots are never changed. Registering or unregistering builds a new one
+    and swaps it in with a single assignment, so threads rendering at the same
+    time can read them without locking.
+    """
+
+    def __init__(self, inlines=()):
+        self.inlines = dict([(inline.name, inline) for inline in inlines])
+        self.classes = dict([(inline.name, inline.cls) for inline in inlines])
+        by_model = {}
+        for inline in inlines:
+            if isinstance(inline.model, ModelBase) and inline.object_key is not None:
+                by_model.setdefault(inline.model, []).append(inline.name)
+        self.by_model = dict([(model, tuple(sorted(names))) for model, names in by_model.items()])
+
+    def get(self, name):
+        return self.inlines.get(name)
+
+    def names_for_model(self, model):
+        return list(self.by_model.get(model, ()))
 
 
 class Registry(object):
 
     def __init__(self):
-        self._registry = {}
+        self.snapshot = RegistrySnapshot()
+        self._write_lock = threading.Lock()
+        self._inline_finder = None
+        self.compiled_cache = CompiledCache(
+            max_size=getattr(settings, 'INLINES_COMPILED_CACHE_SIZE', 1000),
+            use_django_cache=getattr(settings, 'INLINES_COMPILED_CACHE_DJANGO', False),
+            timeout=getattr(settings, 'INLINES_COMPILED_CACHE_TIMEOUT', None),
+        )
+        template_cache_size = getattr(settings, 'INLINES_TEMPLATE_CACHE_SIZE', 1000)
+        self.template_cache = None
+        if template_cache_size:
+            self.template_cache = LRUCache(template_cache_size)
+        self.thread_pool_size = getattr(settings, 'INLINES_THREAD_POOL_SIZE', 4)
+        self.render_timeout = getattr(settings, 'INLINES_RENDER_TIMEOUT', 10)
+        self.max_inline_length = getattr(settings, 'INLINES_MAX_INLINE_LENGTH', 4096)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self.hung_renders = 0
+        self.fragment_cache = FragmentCache(
+            max_size=getattr(settings, 'INLINES_FRAGMENT_CACHE_SIZE', 1000),
+            use_django_cache=getattr(settings, 'INLINES_FRAGMENT_CACHE_DJANGO', False),
+            version=str(getattr(settings, 'INLINES_FRAGMENT_CACHE_VERSION', '')),
+        )
+        self.max_inlines = getattr(settings, 'INLINES_MAX_PER_DOCUMENT', None)
+        self.max_render_time = getattr(settings, 'INLINES_MAX_RENDER_TIME', None)
+        self.max_output_size = getattr(settings, 'INLINES_MAX_OUTPUT_SIZE', None)
+        self.budget_fallback = getattr(settings, 'INLINES_BUDGET_FALLBACK', 'empty')
+        self.stats = None
+        if getattr(settings, 'INLINES_STATS', False):
+            self.stats = StatsCollector(
+                sample_size=getattr(settings, 'INLINES_STATS_SAMPLE_SIZE', 1000),
+                publish_interval=getattr(settings, 'INLINES_STATS_PUBLISH_INTERVAL', 60),
+            )
+        signals.post_save.connect(self.evict_fragments)
+        signals.post_delete.connect(self.evict_fragments)
         self.START_TAG = getattr(settings, 'INLINES_START_TAG', '{{')
         self.END_TAG = getattr(settings, 'INLINES_END_TAG', '}}')
 
+    def _get_start_tag(self):
+        return self._start_tag
+
+    def _set_start_tag(self, value):
+        self._start_tag = value
+        self._inline_finder = None
+
+    START_TAG = property(_get_start_tag, _set_start_tag)
+
+    def _get_end_tag(self):
+        return self._end_tag
+
+    def _set_end_tag(self, value):
+        self._end_tag = value
+        self._inline_finder = None
+
+    END_TAG = property(_get_end_tag, _set_end_tag)
+
     @property
     def inline_finder(self):
-        return re.compile(r'%(start)s\s*(.+?)\s*%(end)s' % {'start':self.START_TAG, 'end':self.END_TAG})
+        """
+        The compiled pattern used to find inlines in text. It's built once and
+        only rebuilt after START_TAG or END_TAG are changed.
+        """
+        if self._inline_finder is None:
+            self._inline_finder = re.compile(r'%(start)s\s*(.+?)\s*%(end)s' % {
+                'start': re.escape(self.START_TAG),
+                'end': re.escape(self.END_TAG),
+            })
+        return self._inline_finder
+
+    @property
+    def _registry(self):
+        """
+        A {name: class} mapping of the registered inlines. Don't change it;
+        use `register` and `unregister`.
+        """
+        return self.snapshot.classes
 
     def register(self, name, cls):
         if not hasattr(cls, 'render'):
             raise TypeError("You may only register inlines with a `render` method")
-        cls.name = name
-        self._registry[name] = cls
+        self._write_lock.acquire()
+        try:
+            cls.name = name
+            inlines = dict(self.snapshot.inlines)
+            inlines[name] = RegisteredInline(name, cls)
+            self._swap(inlines)
+        finally:
+            self._write_lock.release()
 
     def unregister(self, name):
-        if not name in self._registry:
-            raise InlineNotRegisteredError("Inline '%s' not registered. Unable to remove." % name)
-        del(self._registry[name])
+        self._write_lock.acquire()
+        try:
+            if not name in self.snapshot.inlines:
+                raise InlineNotRegisteredError("Inline '%s' not registered. Unable to remove." % name)
+            inlines = dict(self.snapshot.inlines)
+            del(inlines[name])
+            self._swap(inlines)
+        finally:
+            self._write_lock.release()
 
-    def process(self, text, context=None, template_dir=None, **kwargs):
-        def render(matchobj):
+    def _swap(self, inlines):
+        self.snapshot = RegistrySnapshot(inlines.values())
+        self.compiled_cache.invalidate()
+        self.fragment_cache.invalidate()
+        if self.template_cache is not None:
+            self.template_cache.clear()
+
+    def evict_fragments(self, sender, instance, **kwargs):
+        """
+        Drops cached fragments that depend on `instance`. It's connected to
+        the `post_save` and `post_delete` signals.
+        """
+        snapshot = self.snapshot
+        for name in snapshot.names_for_model(sender):
+            if snapshot.inlines[name].cacheable:
+                self.fragment_cache.evict(sender, instance.pk)
+                break
+
+    def names_for_model(self, model):
+        """
+        Returns the names of the registered model inlines for `model`.
+        """
+        return self.snapshot.names_for_model(model)
+
+    def object_key(self, name, value):
+        """
+        Returns the (model, pk) pair the inline registered as `name` refers to
+        with `value`, or None.
+        """
+        inline = self.snapshot.get(name)
+        if inline is None or inline.object_key is None:
+            return None
+        return inline.object_key(value)
+
+    def compile(self, text):
+        """
+        Scans and parses `text` once and returns a `CompiledInlines` that can
+        be rendered any number of times without repeating that work.
+
+        Inlines are matched against the registry as it is when `compile` is
+        called. Results are cached in `compiled_cache` until the registry
+        changes.
+        """
+        key = self.compiled_cache.make_key(text, self.START_TAG, self.END_TAG)
+        compiled = self.compiled_cache.get(key)
+        # A compile racing with register could have cached content linked
+        # against an older snapshot.
+        if compiled is None or compiled.snapshot is not self.snapshot:
+            parsed = self.compiled_cache.get_parsed(key)
+            if parsed is None:
+                parsed = self.parse(text)
+                self.compiled_cache.set_parsed(key, parsed)
+            compiled = self.link(parsed)
+            self.compiled_cache.set(key, compiled)
+        return compiled
+
+    def parse(self, text):
+        """
+        Splits `text` into a tuple of literal chunks and a `ParsedInline` for
+        each inline.
+
+        The result depends only on the text and the tags, not on what's
+        registered, so it's safe to share between processes.
+        """
+        nodes = []
+        pos = 0
+        for match in self.inline_finder.finditer(text):
+            if match.start() > pos:
+                nodes.append(text[pos:match.start()])
+            nodes.append(ParsedInline.from_source(match.group(1), match.group(0)))
+            pos = match.end()
+        if pos < len(text):
+            nodes.append(text[pos:])
+        return tuple(nodes)
+
+    def link(self, parsed):
+        """
+        Turns the output of `parse` into a `CompiledInlines`, matching each
+        inline against the registry.
+        """
+        snapshot = self.snapshot
+        nodes = []
+        for node in parsed:
+            if isinstance(node, ParsedInline):
+                source, name, value, variant, kwargs, text = node
+                node = self.link_inline(source, name, value, variant, kwargs, snapshot, text)
+            nodes.append(node)
+        return CompiledInlines(self, nodes, snapshot)
+
+    def link_inline(self, source, name, value, variant, kwargs, snapshot=None, text=None):
+        """
+        Builds the `InlineCall` for one parsed inline. Errors are stored on the
+        call and raised when it's rendered.
+        """
+        if name is None:
+            return InlineCall(source, error=(InlineUnparsableError, ()), text=text)
+        if snapshot is None:
+            snapshot = self.snapshot
+        inline = snapshot.get(name)
+        error = None
+        if inline is None:
+            error = (InlineNotRegisteredError, ('"%s" was not found as a registered inline' % name,))
+        return InlineCall(source, name, value, variant, kwargs, inline, error, text)
+
+    def prefetch(self, compiled):
+        """
+        Loads the objects for every ModelInline in `compiled`, a
+        `CompiledInlines` or a list of them, with one query per model.
+
+        Returns a {model: {pk: object}} mapping that can be passed to
+        `CompiledInlines.render` as `objects`.
+        """
+        if isinstance(compiled, CompiledInlines):
+            compiled = [compiled]
+        pks = {}
+        for item in compiled:
+            for call in item.calls:
+                if call.error or call.inline.object_key is None:
+                    continue
+                key = call.inline.object_key(call.value)
+                if key is not None:
+                    pks.setdefault(key[0], set()).add(key[1])
+        objects = {}
+        for model, model_pks in pks.items():
+            objects[model] = model.objects.in_bulk(sorted(model_pks))
+        return objects
+
+    def get_budget(self):
+        """
+        Returns a new `RenderBudget` for a document, or None if no limits are
+        set.
+        """
+        if self.max_inlines is None and self.max_render_time is None and self.max_output_size is None:
+            return None
+        return RenderBudget(self.max_inlines, self.max_render_time, self.max_output_size)
+
+    def over_budget(self, call, error):
+        """
+        Returns what's shown instead of an inline that's over its document's
+        budget: nothing, or its raw text if INLINES_BUDGET_FALLBACK is 'raw'.
+        Like other InlineUnrenderableErrors the error is raised if
+        INLINE_DEBUG is True.
+        """
+        if self.stats is not None or inline_rendered.receivers:
+            self.instrument(call, 0, error=error)
+        if getattr(settings, "INLINE_DEBUG", False):
+            raise error
+        if self.budget_fallback == 'raw':
+            if call.text is not None:
+                return call.text
+            return '%s %s %s' % (self.START_TAG, call.source, self.END_TAG)
+        return ""
+
+    def render_inline(self, call, context=None, template_dir=None, objects=None, task=None):
+        """
+        Renders a single `InlineCall` to a string. `objects` is an optional
+        mapping returned by `prefetch`.
+
+        The render is timed and passed to `instrument` if there's a `stats`
+        collector or anything listening to the `inline_rendered` signal.
+        `task` is the `ThreadedRender` when it's run in the thread pool.
+        """
+        instrumented = self.stats is not None or bool(inline_rendered.receivers)
+        if instrumented:
+            started = time.time()
+            queries = query_count()
+        error = None
+        try:
             try:
-                text = matchobj.group(1)
-                name, value, inline_kwargs = parse_inline(text)
-                try:
-                    cls = self._registry[name]
-                except KeyError:
-                    raise InlineNotRegisteredError('"%s" was not found as a registered inline' % name)
-                inline = cls(value, context=context, template_dir=template_dir, **inline_kwargs)
-                return str(inline.render())
+                return self._render_call(call, context, template_dir, objects)
             # Silence any InlineUnrenderableErrors unless INLINE_DEBUG is True
             except InlineUnrenderableError:
+                error = sys.exc_info()[1]
                 debug = getattr(settings, "INLINE_DEBUG", False)
                 if debug:
                     raise
                 else:
                     return ""
-        text = self.inline_finder.sub(render, text)
-        return text
+        finally:
+            finished = task is None or task.finish()
+            if instrumented and finished:
+                self.instrument(call, time.time() - started, query_count() - queries, error)
+
+    def instrument(self, call, duration, queries=0, error=None):
+        """
+        Records how a call's render went with the `stats` collector and sends
+        the `inline_rendered` signal.
+        """
+        name = call.name or ''
+        if self.stats is not None:
+            self.stats.record(name, duration, queries, error)
+        inline_rendered.send(sender=self.__class__, registry=self, name=name, duration=duration, queries=queries, error=error)
+
+    def _render_call(self, call, context, template_dir, objects):
+        if call.error:
+            exc_class, args = call.error
+            raise exc_class(*args)
+        inline = call.inline
+        if inline.cacheable:
+            timeout = inline.cache_timeout
+            depends_on = None
+            if inline.object_key is not None:
+                depends_on = inline.object_key(call.value)
+            key = self.fragment_cache.make_key(call, template_dir, depends_on)
+            output = self.fragment_cache.get(key, timeout)
+            if output is None:
+                # Cacheable inlines never see the context, so their output
+                # can't depend on it.
+                output = self._render_inline(call, None, template_dir, objects)
+                self.fragment_cache.set(key, output, timeout, depends_on)
+            return output
+        return self._render_inline(call, context, template_dir, objects)
+
+    def _render_inline(self, call, context, template_dir, objects):
+        return str(self._build_inline(call, context, template_dir, objects).render())
+
+    def _build_inline(self, call, context, template_dir, objects):
+        return call.inline.build(call, context, template_dir, objects, self.template_cache)
+
+    def get_executor(self):
+        """
+        Returns the thread pool used for `threaded` inlines, or None if
+        threaded rendering is turned off or unavailable.
+        """
+        if futures is None or not self.thread_pool_size:
+            return None
+        if self._executor is None:
+            self._executor_lock.acquire()
+            try:
+                if self._executor is None:
+                    self._executor = futures.ThreadPoolExecutor(self.thread_pool_size)
+            finally:
+                self._executor_lock.release()
+        return self._executor
+
+    def count_hung(self, change):
+        self._executor_lock.acquire()
+        try:
+            self.hung_renders += change
+        finally:
+            self._executor_lock.release()
+
+    def submit_threaded(self, calls, context=None, template_dir=None, objects=None, rendered=None):
+        """
+        Starts rendering the calls whose inline class is `threaded` in the
+        thread pool. Returns a {call: ThreadedRender} mapping for
+        `collect_threaded`.
+
+        Each call gets its own copy of the context's stack so inlines can push
+        and pop on it without getting in each other's way. Calls whose key is
+        already in `rendered`, or that repeat an earlier call, aren't
+        submitted. Nothing is submitted while every thread in the pool is
+        stuck on a render that timed out; the calls are rendered in the
+        calling thread instead.
+        """
+        pending = {}
+        submitted = set()
+        executor = None
+        for call in calls:
+            if call.error or not call.inline.threaded:
+                continue
+            if executor is None:
+                executor = self.get_executor()
+                if executor is None or self.hung_renders >= self.thread_pool_size:
+                    return pending
+            if rendered is not None:
+                if call.key in rendered or call.key in submitted:
+                    continue
+                submitted.add(call.key)
+            task = ThreadedRender(self, call, self.get_render_timeout(call))
+            task.future = executor.submit(self.run_threaded, task, isolate_context(context), template_dir, objects)
+            pending[call] = task
+        return pending
+
+    def run_threaded(self, task, context, template_dir, objects):
+        """
+        Renders a `ThreadedRender` in a pool thread.
+        """
+        if not task.start():
+            return ""
+        try:
+            return self.render_inline(task.call, context, template_dir, objects, task)
+        finally:
+            # Connections are per thread. Close this one rather than leave it
+            # open for as long as the pool thread lives.
+            connection.close()
+
+    def get_render_timeout(self, call):
+        timeout = call.inline.render_timeout
+        if timeout is None:
+            timeout = self.render_timeout
+        return timeout
+
+    def collect_threaded(self, task, context=None, template_dir=None, objects=None):
+        """
+        Waits for a `ThreadedRender` from `submit_threaded`. A call no worker
+        has picked up within its render timeout is taken back and rendered in
+        this thread, so a busy pool never makes an inline time out without
+        running. Inlines that run for longer than their render timeout raise
+        an InlineTimeoutError, which is silenced like any other
+        InlineUnrenderableError.
+        """
+        call = task.call
+        task.picked_up.wait(task.timeout)
+        if task.take_back():
+            task.future.cancel()
+            return self.render_inline(call, context=context, template_dir=template_dir, objects=objects)
+        try:
+            return task.future.result(max(0, task.started + task.timeout - time.time()))
+        except futures.TimeoutError:
+            if not task.time_out():
+                # It finished just now.
+                return task.future.result()
+            error = InlineTimeoutError('"%s" took too long to render' % call.name)
+            if self.stats is not None or inline_rendered.receivers:
+                self.instrument(call, time.time() - task.started, error=error)
+            if getattr(settings, "INLINE_DEBUG", False):
+                raise error
+            return ""
+
+    def validate_inline(self, parsed, snapshot=None):
+        """
+        Checks one `ParsedInline` against the registry: its name must be
+        registered, its variant one of the class's `variants` and its
+        arguments ones in its `inline_args`, if the class lists them.
+
+        Returns a message saying what's wrong, or None.
+        """
+        if parsed.name is None:
+            return 'it could not be parsed'
+        if snapshot is None:
+            snapshot = self.snapshot
+        inline = snapshot.get(parsed.name)
+        if inline is None:
+            return '"%s" was not found as a registered inline' % parsed.name
+        variants = getattr(inline.cls, 'variants', None)
+        if parsed.variant and variants and parsed.variant not in variants:
+            return '"%s" is not a variant of %s' % (parsed.variant, parsed.name)
+        inline_args = getattr(inline.cls, 'inline_args', None)
+        if inline_args is not None:
+            args = dict([(arg['name'], arg) for arg in inline_args])
+            for name, value in parsed.kwargs:
+                if name not in args:
+                    return '"%s" is not an argument of %s' % (name, parsed.name)
+                options = args[name].get('options')
+                if options and value not in options:
+                    return '"%s" is not a valid value for %s' % (value, name)
+        if isinstance(inline.model, ModelBase) and inline.object_key is not None:
+            if inline.object_key(parsed.value) is None:
+                return "'%s' could not be converted to an int" % parsed.value
+        return None
+
+    def validate(self, text):
+        """
+        Checks every inline in `text` with `validate_inline`, without
+        rendering anything. The objects model inlines refer to are looked up
+        with one query per model.
+
+        Returns a list of (ParsedInline, message) pairs in the order the
+        inlines appear in the text, empty if every inline is fine.
+        """
+        if self.START_TAG not in text:
+            return []
+        snapshot = self.snapshot
+        errors = []
+        pks = {}
+        for position, node in enumerate(self.parse(text)):
+            if not isinstance(node, ParsedInline):
+                continue
+            message = self.validate_inline(node, snapshot)
+            if message is not None:
+                errors.append((position, node, message))
+                continue
+            inline = snapshot.get(node.name)
+            if inline.object_key is not None:
+                key = inline.object_key(node.value)
+                if key is not None:
+                    pks.setdefault(key[0], {}).setdefault(key[1], []).append((position, node))
+        for model, nodes in pks.items():
+            found = set(model._default_manager.filter(pk__in=sorted(nodes)).values_list('pk', flat=True))
+            for pk in nodes:
+                if pk not in found:
+                    for position, node in nodes[pk]:
+                        errors.append((position, node, "'%s' could not be found in %s.%s" % (node.value, model._meta.app_label, model._meta.module_name)))
+        errors.sort(key=operator.itemgetter(0))
+        return [(node, message) for position, node, message in errors]
+
+    def normalize(self, text):
+        """
+        Returns `text` with every inline that can be parsed rewritten by
+        `ParsedInline.normalized`. It renders exactly like the original.
+        """
+        if self.START_TAG not in text:
+            return text
+        bits = []
+        for node in self.parse(text):
+            if isinstance(node, ParsedInline):
+                if node.name is None:
+                    node = node.text
+                else:
+                    node = '%s %s %s' % (self.START_TAG, node.normalized(), self.END_TAG)
+            bits.append(node)
+        return ''.join(bits)
+
+    def process(self, text, context=None, template_dir=None, **kwargs):
+        # Most text has no inlines at all. It's returned as is, without being
+        # hashed, scanned or copied.
+        if self.START_TAG not in text:
+            return text
+        return self.compile(text).render(context=context, template_dir=template_dir)
+
+    def iter_process(self, chunks, context=None, template_dir=None):
+        """
+        Processes text given as an iterable of chunks, yielding rendered
+        fragments as it goes. Inlines split across chunks are handled.
+
+        Only text from a start tag that could still become an inline is held
+        back. An inline's text can't span lines, and once the held back text
+        is longer than `max_inline_length` its start tag is let through as
+        plain text, so on long lines without an end tag not much is ever
+        held. Held back text is only scanned again when a chunk brings a line
+        break or part of an end tag.
+        """
+        budget = self.get_budget()
+        start_tag = self.START_TAG
+        max_length = self.max_inline_length
+        # Characters that might finish or rule out the inline being held.
+        triggers = frozenset(self.END_TAG + '\n')
+        buffer = None
+        held = False
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if buffer is None:
+                buffer = chunk
+            else:
+                buffer += chunk
+            if held and (max_length is None or len(buffer) <= max_length) and not triggers.intersection(chunk):
+                continue
+            while True:
+                cut = self._stream_cut(buffer)
+                if cut:
+                    yield self.link(self.parse(buffer[:cut])).render(context=context, template_dir=template_dir, budget=budget)
+                    buffer = buffer[cut:]
+                held = buffer.startswith(start_tag)
+                if not held or max_length is None or len(buffer) <= max_length:
+                    break
+                # Too long to still be an inline.
+                if budget is not None:
+                    budget.add_output(start_tag, inline=False)
+                yield start_tag
+                buffer = buffer[len(start_tag):]
+        if buffer:
+            yield self.link(self.parse(buffer)).render(context=context, template_dir=template_dir, budget=budget)
+
+    def _stream_cut(self, text):
+        """
+        Returns the length of the start of `text` that can be processed without
+        knowing what comes after it.
+        """
+        start_tag = self.START_TAG
+        finder = self.inline_finder
+        pos = 0
+        start = text.find(start_tag)
+        while start != -1:
+            # Hold back from the first start tag whose inline could change
+            # depending on what comes next. An inline that was found without
+            # giving up any of the whitespace after the start tag can't.
+            match = finder.match(text, start)
+            if not (match and self._is_final(text, match)) and self._could_continue(text, start + len(start_tag)):
+                return start
+            if match:
+                pos = match.end()
+            else:
+                pos = start + 1
+            start = text.find(start_tag, pos)
+        # And anything that might be the beginning of a start tag.
+        for length in range(len(start_tag) - 1, 0, -1):
+            if len(text) - length >= pos and text.endswith(start_tag[:length]):
+                return len(text) - length
+        return len(text)
+
+    def _is_final(self, text, match):
+        """
+        Returns True if `match` kept all the whitespace after its start tag,
+        which means no more text could make it match differently.
+        """
+        pos = match.start() + len(self.START_TAG)
+        while text[pos] in WHITESPACE:
+            pos += 1
+        return match.start(1) == pos
+
+    def _could_continue(self, text, pos):
+        """
+        Returns True if the text from `pos`, just after a start tag, to the end
+        of `text` could be the beginning of an inline: some whitespace, the
+        inline on one line, more whitespace and part of an end tag.
+        """
+        length = len(text)
+        while pos < length and text[pos] in WHITESPACE:
+            pos += 1
+        while pos < length and text[pos] != '\n':
+            pos += 1
+        while pos < length and text[pos] in WHITESPACE:
+            pos += 1
+        return length - pos < len(self.END_TAG) and self.END_TAG.startswith(text[pos:])
+
+    def process_many(self, texts, context=None, template_dir=None):
+        """
+        Processes a list of texts and returns the rendered strings in the same
+        order.
+
+        All the texts are compiled first so objects for ModelInlines are
+        loaded with one query per model for the whole list, and inlines that
+        appear more than once (in any of the texts) are only rendered once.
+        """
+        texts = list(texts)
+        compiled = [self.compile(text) for text in texts if self.START_TAG in text]
+        objects = self.prefetch(compiled)
+        rendered = {}
+        compiled = iter(compiled)
+        results = []
+        for text in texts:
+            if self.START_TAG in text:
+                text = next(compiled).render(context=context, template_dir=template_dir, objects=objects, rendered=rendered)
+            results.append(text)
+        return results
+
+
+class InlineCall(object):
+    """
+    A single inline found by `Registry.compile`: the raw `source` between the
+    tags, the parsed name, value, variant and kwargs, and the registered class
+    it resolved to, as a `RegisteredInline` and its class.
+
+    `kwargs` is stored as a sorted tuple of (name, value) pairs. If the inline
+    couldn't be parsed or isn't registered `error` holds an (exception class,
+    args) pair that's raised when the call is rendered. Calls with the same
+    `key` render the same way. `text` is the inline exactly as it appeared in
+    the document, tags included.
+    """
+
+    __slots__ = ('source', 'name', 'value', 'variant', 'kwargs', 'inline', 'cls', 'error', 'key', 'text')
+
+    def __init__(self, source, name=None, value="", variant=None, kwargs=(), inline=None, error=None, text=None):
+        self.source = source
+        self.text = text
+        self.name = name
+        self.value = value
+        self.variant = variant
+        self.kwargs = kwargs
+        self.inline = inline
+        self.cls = None
+        if inline is not None:
+            self.cls = inline.cls
+        self.error = error
+        self.key = (name, value, variant, kwargs)
+
+    def get_kwargs(self):
+        return dict(self.kwargs)
+
+
+class CompiledInlines(object):
+    """
+    The result of `Registry.compile`. `nodes` is a tuple of literal chunks of
+    text and the `InlineCall` objects found between them.
+
+    Rendering only walks the nodes. Nothing is scanned, parsed or looked up in
+    the registry again.
+    """
+
+    def __init__(self, registry, nodes, snapshot=None):
+        self.registry = registry
+        self.snapshot = snapshot
+        self.nodes = tuple(nodes)
+        self.calls = tuple([node for node in self.nodes if isinstance(node, InlineCall)])
+
+    def render(self, context=None, template_dir=None, objects=None, rendered=None, budget=None):
+        """
+        Renders the compiled text. Objects for ModelInlines are loaded with
+        one query per model unless a mapping from `Registry.prefetch` is
+        passed as `objects`.
+
+        `rendered` is an optional dictionary of already rendered inlines keyed
+        by `InlineCall.key`. It's filled in as inlines are rendered so it can
+        be shared between texts rendered with the same context.
+
+        Inlines marked `threaded` are started in the registry's thread pool
+        before anything else is rendered.
+
+        `budget` is the `RenderBudget` to render within. By default a new one
+        is made from the registry's settings. Inlines over budget are replaced
+        by `Registry.over_budget`.
+        """
+        registry = self.registry
+        if budget is None:
+            budget = registry.get_budget()
+        if objects is None:
+            objects = registry.prefetch(self)
+        calls = self.calls
+        if budget is not None and budget.max_inlines is not None:
+            calls = calls[:budget.remaining_inlines()]
+        pending = registry.submit_threaded(calls, context, template_dir, objects, rendered)
+        bits = []
+        for node in self.nodes:
+            if isinstance(node, InlineCall):
+                call = node
+                try:
+                    if budget is not None:
+                        budget.start_inline()
+                    if rendered is not None and call.key in rendered:
+                        node = rendered[call.key]
+                    else:
+                        if call in pending:
+                            node = registry.collect_threaded(pending.pop(call), context, template_dir, objects)
+                        else:
+                            node = registry.render_inline(call, context=context, template_dir=template_dir, objects=objects)
+                        if rendered is not None:
+                            rendered[call.key] = node
+                    if budget is not None:
+                        budget.add_output(node)
+                except InlineBudgetError:
+                    node = registry.over_budget(call, sys.exc_info()[1])
+            elif budget is not None:
+                budget.add_output(node, inline=False)
+            bits.append(node)
+        # Calls left over budget don't need to run.
+        for task in pending.values():
+            if task.take_back():
+                task.future.cancel()
+        return ''.join(bits)
 
 
 # The default registry.
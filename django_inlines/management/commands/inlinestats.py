@@ -0,0 +1,50 @@
+from optparse import make_option
+from django.core.management.base import NoArgsCommand
+from django.utils import simplejson
+
+from django_inlines.stats import load_published
+
+
+class Command(NoArgsCommand):
+    help = "Prints the inline render stats published by every process."
+    option_list = NoArgsCommand.option_list + (
+        make_option('--json', action='store_true', dest='json', default=False,
+            help='Output the stats as JSON.'),
+        make_option('--sort', dest='sort', default='total',
+            help='Sort by "total" time, "count", "errors", "p95" or "name".'),
+    )
+
+    columns = ('name', 'count', 'errors', 'mean', 'p50', 'p95', 'p99', 'max', 'total', 'queries')
+
+    def handle_noargs(self, **options):
+        stats = load_published()
+        rows = []
+        for name, s in stats.items():
+            rows.append({
+                'name': name,
+                'count': s.count,
+                'errors': s.error_count,
+                'error_classes': s.errors,
+                'mean': s.mean_time * 1000,
+                'p50': s.percentile(50) * 1000,
+                'p95': s.percentile(95) * 1000,
+                'p99': s.percentile(99) * 1000,
+                'max': s.max_time * 1000,
+                'total': s.total_time * 1000,
+                'queries': s.queries,
+            })
+        sort = options.get('sort', 'total')
+        rows.sort(key=lambda row: row[sort], reverse=sort != 'name')
+
+        if options.get('json'):
+            return simplejson.dumps(rows, indent=2)
+        if not rows:
+            return "No inline stats have been published. Set INLINES_STATS = True to collect them.\n"
+
+        lines = ['%-20s %8s %7s %9s %9s %9s %9s %9s %11s %8s' % self.columns]
+        for row in rows:
+            lines.append('%-20s %8d %7d %9.2f %9.2f %9.2f %9.2f %9.2f %11.1f %8d' % tuple([row[c] for c in self.columns]))
+            for error_class, count in sorted(row['error_classes'].items()):
+                lines.append('    %s: %d' % (error_class, count))
+        lines.append('Times are in milliseconds. Queries are only counted when DEBUG is on.')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,53 @@
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+
+from django_inlines.forms import inline_fields
+from django_inlines.models import InlineOccurrence, model_label
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the inline occurrence index for every InlineField, or those of the given models."
+    args = '[app_label.ModelName ...]'
+    option_list = BaseCommand.option_list + (
+        make_option('--batch-size', type='int', dest='batch_size', default=500,
+            help='How many documents to load at a time. Default: 500'),
+    )
+
+    def handle(self, *labels, **options):
+        # Make sure every model, and so every InlineField, has been loaded.
+        models.get_models()
+        batch_size = options.get('batch_size') or 500
+        verbosity = int(options.get('verbosity', 1))
+
+        labels = [label.lower() for label in labels]
+        fields = [(model, field) for model, field in inline_fields if not model._meta.abstract]
+        if labels:
+            known = set([model_label(model) for model, field in fields])
+            for label in labels:
+                if label not in known:
+                    raise CommandError("%s has no InlineFields." % label)
+            fields = [(model, field) for model, field in fields if model_label(model) in labels]
+
+        lines = []
+        for model, field in fields:
+            label = model_label(model)
+            InlineOccurrence.objects.filter(document_type=label, field=field.name).delete()
+            queryset = model._default_manager.order_by('pk')
+            count = 0
+            last_pk = None
+            while True:
+                batch = queryset
+                if last_pk is not None:
+                    batch = batch.filter(pk__gt=last_pk)
+                batch = list(batch[:batch_size])
+                if not batch:
+                    break
+                for document in batch:
+                    InlineOccurrence.objects.index(document, field, clear=False)
+                count += len(batch)
+                last_pk = batch[-1].pk
+            if verbosity:
+                lines.append("Indexed %d %s.%s documents." % (count, label, field.name))
+        if lines:
+            return '\n'.join(lines) + '\n'
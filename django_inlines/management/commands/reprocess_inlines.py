@@ -0,0 +1,96 @@
+import sys
+import time
+from optparse import make_option
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+
+from django_inlines.forms import inline_fields
+from django_inlines.models import model_label
+from django_inlines.reprocess import pk_ranges, reprocess_range, close_connection, in_memory_database
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+class Command(BaseCommand):
+    help = ("Renders the text of every InlineField again, or those of the given models or fields, "
+            "and stores the rendered copies that changed.")
+    args = '[app_label.ModelName[.field] ...]'
+    option_list = BaseCommand.option_list + (
+        make_option('--processes', type='int', dest='processes', default=None,
+            help='How many worker processes to use. Default: one per CPU. 1 works in this process.'),
+        make_option('--batch-size', type='int', dest='batch_size', default=500,
+            help='How many documents each worker renders at a time. Default: 500'),
+        make_option('--dry-run', action='store_true', dest='dry_run', default=False,
+            help="Only count the inlines and the ones that can't be rendered. Nothing is written."),
+    )
+
+    def handle(self, *labels, **options):
+        # Make sure every model, and so every InlineField, has been loaded.
+        models.get_models()
+        batch_size = options.get('batch_size') or 500
+        dry_run = options.get('dry_run', False)
+        verbosity = int(options.get('verbosity', 1))
+        processes = options.get('processes')
+        if processes is None:
+            processes = multiprocessing is not None and multiprocessing.cpu_count() or 1
+        if in_memory_database():
+            processes = 1
+
+        fields = self.get_fields([label.lower() for label in labels])
+        tasks = []
+        for model, field in fields:
+            label = model_label(model)
+            for first, last in pk_ranges(model, batch_size):
+                tasks.append((label, field.name, first, last, dry_run))
+
+        pool = None
+        if processes > 1 and multiprocessing is not None and len(tasks) > 1:
+            # Workers must open their own connections.
+            connection.close()
+            pool = multiprocessing.Pool(processes, initializer=close_connection)
+            results = pool.imap_unordered(reprocess_range, tasks)
+        else:
+            results = map(reprocess_range, tasks)
+
+        totals = {'documents': 0, 'inlines': 0, 'errors': 0, 'updated': 0}
+        started = time.time()
+        try:
+            for done, result in enumerate(results):
+                for key in totals:
+                    totals[key] += result[key]
+                if verbosity > 1:
+                    self.progress(done + 1, len(tasks), totals, time.time() - started)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        if verbosity:
+            elapsed = time.time() - started
+            totals['seconds'] = elapsed
+            totals['rate'] = totals['documents'] / max(elapsed, 0.001)
+            summary = "%(documents)d documents, %(inlines)d inlines, %(errors)d errors in %(seconds).1fs (%(rate).1f documents/s)" % totals
+            if dry_run:
+                return "Dry run: %s.\n" % summary
+            return "%s. %d rendered copies updated.\n" % (summary, totals['updated'])
+
+    def get_fields(self, labels):
+        fields = [(model, field) for model, field in inline_fields if not model._meta.abstract]
+        if not labels:
+            return fields
+        selected = []
+        for label in labels:
+            matches = [(model, field) for model, field in fields
+                       if label in (model_label(model), ('%s.%s' % (model_label(model), field.name)).lower())]
+            if not matches:
+                raise CommandError("%s has no InlineFields." % label)
+            selected.extend([match for match in matches if match not in selected])
+        return selected
+
+    def progress(self, done, total, totals, elapsed):
+        sys.stdout.write("%d/%d batches, %d documents, %d errors, %.1f documents/s\n" % (
+            done, total, totals['documents'], totals['errors'], totals['documents'] / max(elapsed, 0.001)))
+        sys.stdout.flush()
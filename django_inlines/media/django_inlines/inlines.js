@@ -1,8 +1,86 @@
 var DjangoInlines = DjangoInlines || {}
 
+// Form schemas for every registered inline, by name, once they're loaded.
+DjangoInlines.schemas = null;
+DjangoInlines.schema_callbacks = [];
+
+// Calls callback with the schemas, loading them with one request the first
+// time they're needed. If the request fails the waiting callbacks are
+// dropped, so the next call asks again.
+DjangoInlines.loadSchemas = function(callback) {
+  if (DjangoInlines.schemas) { callback(DjangoInlines.schemas); return; }
+  DjangoInlines.schema_callbacks.push(callback);
+  if (DjangoInlines.schema_callbacks.length > 1) { return; }
+  $.ajax({
+    url: DjangoInlines.inline_schemas_url,
+    dataType: 'json',
+    success: function(data) {
+      DjangoInlines.admin_media_prefix = data.admin_media_prefix;
+      var schemas = {};
+      $.each(data.inlines, function(i, schema) { schemas[schema.name] = schema; });
+      DjangoInlines.schemas = schemas;
+      var callbacks = DjangoInlines.schema_callbacks;
+      DjangoInlines.schema_callbacks = [];
+      $.each(callbacks, function(i, callback) { callback(schemas); });
+    },
+    error: function() {
+      DjangoInlines.schema_callbacks = [];
+    }
+  });
+};
+
+// Builds the form for inserting an inline into the textarea with id target.
+// It's the same markup get_inline_form used to render on the server.
+DjangoInlines.buildForm = function(schema, target) {
+  var form = $('<div></div>');
+
+  var value = $('<p class="value"><label class="required">Value:</label> <input type="text" class="value"></p>');
+  value.find('label').attr('for', 'id_'+target+'_value');
+  value.find('input').attr('id', 'id_'+target+'_value');
+  if (schema.app_path) {
+    var lookup = $('<a class="related-lookup" onclick="return showRelatedObjectLookupPopup(this);"> <img width="16" height="16" alt="Lookup" /></a>');
+    lookup.attr('href', '../../../'+schema.app_path+'/?t=id').attr('id', 'lookup_id_'+target+'_value');
+    lookup.find('img').attr('src', DjangoInlines.admin_media_prefix+'img/admin/selector-search.gif');
+    value.append(' ').append(lookup);
+  }
+  if (schema.help_text) { value.append(' ').append($('<span class="help_text"></span>').text(schema.help_text)); }
+  form.append(value);
+
+  if (schema.variants.length) {
+    var variants = $('<p class="variants"><label>Variant:</label> <select><option value="">----</option></select></p>');
+    variants.find('label').attr('for', target+'_variant');
+    var select = variants.find('select').attr('id', target+'_variant');
+    $.each(schema.variants, function(i, variant) { select.append($('<option></option>').val(variant).text(variant)); });
+    form.append(variants);
+  }
+
+  $.each(schema.args, function(i, arg) {
+    var p = $('<p class="arg"><label></label> </p>');
+    p.find('label').attr('for', target+'_'+arg.name).text(arg.name.charAt(0).toUpperCase()+arg.name.slice(1)+':');
+    var input;
+    if (arg.options.length) {
+      input = $('<select class="value"><option value="">----</option></select>');
+      $.each(arg.options, function(i, option) { input.append($('<option></option>').val(option).text(option)); });
+    } else {
+      input = $('<input class="value" type="text">');
+    }
+    input.attr('rel', arg.name).attr('id', target+'_'+arg.name);
+    p.append(input);
+    if (arg.help_text) { p.append(' ').append($('<span class="help_text"></span>').text(arg.help_text)); }
+    form.append(p);
+  });
+
+  var submit = $('<p class="submit_row"><input class="insert" type="button" value="Insert"> <a class="cancel" href="#">Cancel</a></p>');
+  submit.find('input').attr('rel', target);
+  form.append(submit);
+  return form.children();
+};
+
 
 $(function() {
-  
+
+  if ($('.vInlineTextArea').length) { DjangoInlines.loadSchemas(function(){}); }
+
   $('.vInlineTextArea').each(function(){
     var id = this.id;
     var div = $('<div id="inline_control_for_'+id+'" class="inline_control"><p class="insert">Insert inline: </p></div>');
@@ -14,7 +92,9 @@ $(function() {
       var inline = $(this).val();
       var inserter = $('#'+id+'_inlineinserter');
       if (inline == '') { inserter.html(''); return false }
-      inserter.load(DjangoInlines.get_inline_form_url + "?inline="+$(this).val()+"&target="+id);
+      DjangoInlines.loadSchemas(function(schemas) {
+        inserter.empty().append(DjangoInlines.buildForm(schemas[inline], id));
+      });
     });
     
     div.find('p').append(select);
@@ -0,0 +1,135 @@
+from django.db import models
+from django.utils.encoding import smart_unicode
+
+
+def model_label(model):
+    """
+    Returns ``"app_label.module_name"`` for a model class.
+    """
+    return '%s.%s' % (model._meta.app_label, model._meta.module_name)
+
+
+def get_labelled_model(label):
+    app_label, module_name = label.split('.', 1)
+    return models.get_model(app_label, module_name)
+
+
+def to_pk(model, value):
+    """
+    Converts a primary key stored in the index as text back to `model`'s
+    primary key type.
+    """
+    field = model._meta.pk
+    while field.rel is not None:
+        field = field.rel.get_related_field()
+    return field.to_python(value)
+
+
+class InlineOccurrenceManager(models.Manager):
+
+    def for_key(self, model, pk):
+        """
+        The occurrences of model inlines that refer to the `model` object with
+        primary key `pk`, which needn't exist any more.
+        """
+        return self.filter(target_type=model_label(model), target_id=smart_unicode(pk))
+
+    def for_object(self, obj):
+        """
+        The occurrences of model inlines that refer to `obj`.
+        """
+        return self.for_key(obj.__class__, obj.pk)
+
+    def for_document(self, document, field=None):
+        """
+        The occurrences of inlines in `document`, optionally in just one of
+        its fields, given by name.
+        """
+        occurrences = self.filter(document_type=model_label(document.__class__), document_id=smart_unicode(document.pk))
+        if field is not None:
+            occurrences = occurrences.filter(field=field)
+        return occurrences
+
+    def document_ids(self, target, model, field=None):
+        """
+        Returns the pks of `model` objects that use `target`, a (model, pk)
+        pair, in a model inline, optionally only in the field named `field`.
+        """
+        occurrences = self.for_key(*target).filter(document_type=model_label(model))
+        if field is not None:
+            occurrences = occurrences.filter(field=field)
+        return sorted(set([to_pk(model, pk) for pk in occurrences.values_list('document_id', flat=True)]))
+
+    def documents_using(self, obj, model=None):
+        """
+        Returns every document that uses `obj` in a model inline, loaded with
+        one query per document model. `model` limits them to one model.
+        """
+        occurrences = self.for_object(obj)
+        if model is not None:
+            occurrences = occurrences.filter(document_type=model_label(model))
+        ids = {}
+        for document_type, document_id in occurrences.values_list('document_type', 'document_id'):
+            ids.setdefault(document_type, set()).add(document_id)
+        documents = []
+        for document_type, pks in sorted(ids.items()):
+            document_model = get_labelled_model(document_type)
+            if document_model is None:
+                continue
+            found = document_model._default_manager.in_bulk([to_pk(document_model, pk) for pk in pks])
+            documents.extend([found[pk] for pk in sorted(found)])
+        return documents
+
+    def index(self, document, field, registry=None, clear=True):
+        """
+        Replaces the indexed occurrences for the InlineField `field` of
+        `document` with the inlines its text has now. Pass ``clear=False`` if
+        the old ones have already been deleted.
+        """
+        from django_inlines import inlines
+        if registry is None:
+            registry = inlines.registry
+        if clear:
+            self.for_document(document, field.name).delete()
+        document_type = model_label(document.__class__)
+        document_id = smart_unicode(document.pk)
+        seen = set()
+        for node in registry.parse(getattr(document, field.attname) or ''):
+            if not isinstance(node, inlines.ParsedInline) or node.name is None:
+                continue
+            target = registry.object_key(node.name, node.value)
+            if (node.name, node.value, target) in seen:
+                continue
+            seen.add((node.name, node.value, target))
+            occurrence = self.model(document_type=document_type, document_id=document_id,
+                                    field=field.name, name=node.name, value=node.value[:255])
+            if target is not None:
+                occurrence.target_type = model_label(target[0])
+                occurrence.target_id = smart_unicode(target[1])
+            occurrence.save()
+
+
+class InlineOccurrence(models.Model):
+    """
+    One inline used in an InlineField, indexed so the documents using an
+    object can be found without searching their text.
+
+    Primary keys are stored as text, so documents and objects with any kind
+    of primary key can be indexed. ``sql/inlineoccurrence.sql`` adds an index
+    on (target_type, target_id), which every lookup by object uses.
+    """
+    document_type = models.CharField(max_length=100)
+    document_id = models.CharField(max_length=255, db_index=True)
+    field = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
+    value = models.CharField(max_length=255)
+    target_type = models.CharField(max_length=100, blank=True)
+    target_id = models.CharField(max_length=100, null=True, blank=True)
+
+    objects = InlineOccurrenceManager()
+
+    class Meta:
+        ordering = ('document_type', 'document_id', 'field')
+
+    def __unicode__(self):
+        return u'%s %s in %s %s' % (self.name, self.value, self.document_type, self.document_id)
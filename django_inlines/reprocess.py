@@ -0,0 +1,128 @@
+"""
+Reprocessing the text stored in InlineFields in bulk.
+
+The ``reprocess_inlines`` management command splits every field's table into
+primary key ranges and hands them to `reprocess_range`, in a pool of worker
+processes if it can. Each range is rendered with `Registry.process_many`, so
+objects for model inlines are loaded with one query per model per range, and
+only the rendered copies that changed are written back.
+"""
+from django.db import connection, transaction
+from django.db.models import get_model
+
+from django_inlines import inlines
+from django_inlines.signals import inline_rendered
+
+
+class RenderCounter(object):
+    """
+    Counts the inlines a registry renders, and how many of them failed, while
+    it's connected to `inline_rendered`.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.rendered = 0
+        self.errors = 0
+
+    def __call__(self, sender, registry, error=None, **kwargs):
+        if registry is self.registry:
+            self.rendered += 1
+            if error is not None:
+                self.errors += 1
+
+    def connect(self):
+        inline_rendered.connect(self, weak=False)
+
+    def disconnect(self):
+        inline_rendered.disconnect(self)
+
+
+def get_field(label, field_name):
+    app_label, module_name = label.split('.', 1)
+    model = get_model(app_label, module_name)
+    return model, model._meta.get_field(field_name)
+
+
+def pk_ranges(model, size):
+    """
+    Yields (first, last) pairs of primary keys splitting `model`'s table into
+    ranges of at most `size` objects.
+    """
+    pks = model._default_manager.order_by('pk').values_list('pk', flat=True).iterator()
+    batch = []
+    for pk in pks:
+        batch.append(pk)
+        if len(batch) == size:
+            yield batch[0], batch[-1]
+            batch = []
+    if batch:
+        yield batch[0], batch[-1]
+
+
+def write_renders(model, field, renders):
+    """
+    Stores the rendered copies in `renders`, a list of (pk, rendered) pairs,
+    in one transaction.
+    """
+    manager = model._default_manager
+    for pk, rendered in renders:
+        manager.filter(pk=pk).update(**{field.rendered_field: rendered})
+write_renders = transaction.commit_on_success(write_renders)
+
+
+def reprocess_range(task):
+    """
+    Renders one range of documents. `task` is a (label, field name, first pk,
+    last pk, dry run) tuple so it can be sent to another process.
+
+    Returns a dict with the number of `documents` read, `inlines` found,
+    inline renders that raised a silenced `errors` and rendered copies
+    `updated`. Nothing is written on a dry run, or for fields that don't keep
+    a rendered copy.
+    """
+    label, field_name, first, last, dry_run = task
+    model, field = get_field(label, field_name)
+    registry = inlines.registry
+    columns = ['pk', field.attname]
+    if field.rendered_field:
+        columns.append(field.rendered_field)
+    rows = list(model._default_manager.filter(pk__gte=first, pk__lte=last).order_by('pk').values_list(*columns))
+
+    found = 0
+    for row in rows:
+        if row[1] and registry.START_TAG in row[1]:
+            found += len(registry.compile(row[1]).calls)
+
+    counter = RenderCounter(registry)
+    counter.connect()
+    try:
+        results = registry.process_many([row[1] or '' for row in rows])
+    finally:
+        counter.disconnect()
+
+    renders = []
+    if field.rendered_field and not dry_run:
+        for row, rendered in zip(rows, results):
+            if rendered != row[2]:
+                renders.append((row[0], rendered))
+        if renders:
+            write_renders(model, field, renders)
+    return {'documents': len(rows), 'inlines': found, 'errors': counter.errors, 'updated': len(renders)}
+
+
+def in_memory_database():
+    """
+    Returns True if the connection is to an in-memory SQLite database, which
+    other processes can't open.
+    """
+    return (connection.__class__.__module__.startswith('django.db.backends.sqlite3')
+            and connection.settings_dict['DATABASE_NAME'] in ('', ':memory:'))
+
+
+def close_connection():
+    """
+    Used as the worker processes' initializer, so each opens its own database
+    connection instead of sharing the one inherited from the parent.
+    """
+    connection.connection = None
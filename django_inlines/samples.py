@@ -16,6 +16,8 @@ class YoutubeInline(TemplateInline):
         {{ youtube 4R-7ZO4I1pI width=850 height=500 }}
 
     """
+    __slots__ = ()
+
     help_text = "Takes a youtube URL or video ID: http://www.youtube.com/watch?v=4R-7ZO4I1pI or 4R-7ZO4I1pI"
     inline_args = [
         dict(name='height', help_text="In pixels"),
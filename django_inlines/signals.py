@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent by a Registry after each inline is rendered. `duration` is in seconds,
+# `queries` is only counted when DEBUG is on and `error` is the silenced
+# InlineUnrenderableError, if there was one.
+inline_rendered = Signal(providing_args=['registry', 'name', 'duration', 'queries', 'error'])
@@ -0,0 +1 @@
+CREATE INDEX django_inlines_inlineoccurrence_target ON django_inlines_inlineoccurrence (target_type, target_id);
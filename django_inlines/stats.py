@@ -0,0 +1,202 @@
+"""
+Render statistics for inlines.
+
+A `Registry` with a `stats` collector records every inline it renders: how
+long it took, how many database queries it made (only counted when DEBUG is
+on, since that's when Django keeps them) and which silenced error it raised,
+if any. Collectors publish their numbers to Django's cache every so often so
+the ``inlinestats`` management command can report on all processes.
+"""
+import os
+import random
+import socket
+import threading
+import time
+from django.core.cache import cache as django_cache
+from django.conf import settings
+from django.db import connection
+
+KEY_PREFIX = 'django_inlines.stats.1'
+SLOT_PREFIX = 'django_inlines.stats.1.slot'
+
+# How many processes can publish at once. Each claims a numbered slot key
+# holding the key of its stats, so no process ever rewrites a shared list.
+MAX_PUBLISHERS = 256
+
+# How long published stats are kept, in seconds, when there's no interval.
+PUBLISH_TIMEOUT = 600
+
+
+def query_count():
+    """
+    Returns the number of queries run so far on this thread's connection, or
+    0 if Django isn't keeping track of them.
+    """
+    if settings.DEBUG:
+        return len(connection.queries)
+    return 0
+
+
+class InlineStats(object):
+    """
+    The numbers for one inline name. Render times are kept as a random sample
+    of at most `sample_size` renders to work out percentiles.
+    """
+
+    def __init__(self, sample_size=1000):
+        self.sample_size = sample_size
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.queries = 0
+        self.errors = {}
+        self.samples = []
+
+    def add(self, duration, queries=0, error=None):
+        self.count += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.queries += queries
+        if error is not None:
+            name = error.__class__.__name__
+            self.errors[name] = self.errors.get(name, 0) + 1
+        if len(self.samples) < self.sample_size:
+            self.samples.append(duration)
+        else:
+            i = random.randint(0, self.count - 1)
+            if i < self.sample_size:
+                self.samples[i] = duration
+
+    def percentile(self, percent):
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        i = int(round(percent / 100.0 * (len(samples) - 1)))
+        return samples[i]
+
+    @property
+    def mean_time(self):
+        if not self.count:
+            return 0.0
+        return self.total_time / self.count
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_time': self.total_time,
+            'max_time': self.max_time,
+            'queries': self.queries,
+            'errors': dict(self.errors),
+            'samples': list(self.samples),
+        }
+
+    def merge(self, data):
+        """
+        Adds in the numbers from another collector's `as_dict`. The samples
+        are combined, so percentiles are approximate.
+        """
+        self.count += data['count']
+        self.total_time += data['total_time']
+        self.max_time = max(self.max_time, data['max_time'])
+        self.queries += data['queries']
+        for name, count in data['errors'].items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        self.samples.extend(data['samples'])
+        if len(self.samples) > self.sample_size:
+            self.samples = random.sample(self.samples, self.sample_size)
+
+
+class StatsCollector(object):
+    """
+    Collects `InlineStats` per inline name in process. It's thread safe.
+
+    If `publish_interval` is set the stats are written to Django's cache at
+    most that often, in seconds, as inlines are rendered.
+    """
+
+    def __init__(self, sample_size=1000, publish_interval=60):
+        self.sample_size = sample_size
+        self.publish_interval = publish_interval
+        self.key = '%s.%s.%s' % (KEY_PREFIX, socket.gethostname(), os.getpid())
+        self._lock = threading.Lock()
+        self.inlines = {}
+        self.published = time.time()
+        self.slot = None
+
+    def record(self, name, duration, queries=0, error=None):
+        self._lock.acquire()
+        try:
+            stats = self.inlines.get(name)
+            if stats is None:
+                stats = self.inlines[name] = InlineStats(self.sample_size)
+            stats.add(duration, queries, error)
+        finally:
+            self._lock.release()
+        if self.publish_interval and time.time() - self.published >= self.publish_interval:
+            self.publish()
+
+    def reset(self):
+        self._lock.acquire()
+        try:
+            self.inlines = {}
+        finally:
+            self._lock.release()
+
+    def snapshot(self):
+        """
+        Returns a {name: dict} copy of the stats that can be pickled.
+        """
+        self._lock.acquire()
+        try:
+            return dict([(name, stats.as_dict()) for name, stats in self.inlines.items()])
+        finally:
+            self._lock.release()
+
+    def publish(self):
+        """
+        Writes this process's stats to Django's cache.
+
+        The process's key is recorded in the first free slot, claimed with
+        `cache.add` so processes publishing at the same time can't overwrite
+        each other. Slots expire with the stats they point to.
+        """
+        self.published = time.time()
+        timeout = PUBLISH_TIMEOUT
+        if self.publish_interval:
+            timeout = max(self.publish_interval * 10, PUBLISH_TIMEOUT)
+        django_cache.set(self.key, self.snapshot(), timeout)
+        if self.slot is not None and django_cache.get(slot_key(self.slot)) == self.key:
+            django_cache.set(slot_key(self.slot), self.key, timeout)
+            return
+        self.slot = None
+        for slot in range(MAX_PUBLISHERS):
+            if django_cache.add(slot_key(slot), self.key, timeout):
+                self.slot = slot
+                break
+
+
+def slot_key(slot):
+    return '%s.%d' % (SLOT_PREFIX, slot)
+
+
+def load_published(sample_size=1000):
+    """
+    Returns a {name: InlineStats} mapping combining the stats every process
+    has published.
+    """
+    combined = {}
+    slots = django_cache.get_many([slot_key(slot) for slot in range(MAX_PUBLISHERS)])
+    keys = set(slots.values())
+    for key in sorted(keys):
+        snapshot = django_cache.get(key)
+        if not snapshot:
+            continue
+        for name, data in snapshot.items():
+            if name not in combined:
+                combined[name] = InlineStats(sample_size)
+            combined[name].merge(data)
+    return combined
@@ -4,6 +4,7 @@ DjangoInlines.inlines = [];
 {% for inline in inlines %}DjangoInlines.inlines.push('{{ inline.name }}');
 {% endfor %}
 DjangoInlines.get_inline_form_url = "{% url get_inline_form %}";
+DjangoInlines.inline_schemas_url = "{% url inline_schemas %}?v={{ inline_schemas_version }}";
 
 {% comment %}
 {% for inline in inlines %}
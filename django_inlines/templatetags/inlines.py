@@ -7,6 +7,8 @@ register = template.Library()
 @register.filter
 def stripinlines(value):
     from django_inlines.inlines import registry
+    if registry.START_TAG not in value:
+        return value
     return registry.inline_finder.sub('', value)
 
 
@@ -21,10 +23,13 @@ class InlinesNode(template.Node):
         try:
             from django_inlines.inlines import registry
 
-            if self.template_directory is None:
-                rendered = registry.process(self.var_name.resolve(context), context=context)
+            value = self.var_name.resolve(context)
+            if registry.START_TAG not in value:
+                rendered = value
+            elif self.template_directory is None:
+                rendered = registry.compile(value).render(context=context)
             else:
-                rendered = registry.process(self.var_name.resolve(context), context=context, template_dir=self.template_directory)
+                rendered = registry.compile(value).render(context=context, template_dir=self.template_directory)
             if self.asvar:
                 context[self.asvar] = rendered
                 return ''
@@ -78,3 +83,73 @@ def process_inlines(parser, token):
                 kwargs['asvar'] = v
 
     return InlinesNode(var_name, **kwargs)
+
+
+class BulkInlinesNode(template.Node):
+
+    def __init__(self, var_name, attr, asvar, template_directory=None):
+        self.var_name = template.Variable(var_name)
+        self.attr = template.Variable(attr)
+        self.asvar = asvar
+        self.template_directory = template_directory
+
+    def render(self, context):
+        try:
+            from django_inlines.inlines import registry
+
+            texts = [self.attr.resolve(item) for item in self.var_name.resolve(context)]
+            if self.template_directory is None:
+                context[self.asvar] = registry.process_many(texts, context=context)
+            else:
+                context[self.asvar] = registry.process_many(texts, context=context, template_dir=self.template_directory)
+            return ''
+        except:
+            if getattr(settings, 'INLINE_DEBUG', False):
+                raise
+            return ''
+
+
+@register.tag
+def process_inlines_bulk(parser, token):
+    """
+    Processes the same field of every item in a list in one go and stores the
+    rendered strings, in order, in a context variable. Objects used by model
+    inlines are loaded once for the whole list.
+
+    Syntax::
+
+        {% process_inlines_bulk entries "field" [in template_dir] as varname %}
+
+    Examples::
+
+        {% process_inlines_bulk entries "body" as bodies %}
+
+        {% process_inlines_bulk entries "body" in 'inlines/sidebar' as bodies %}
+
+    """
+
+    args = token.split_contents()
+
+    if not len(args) in (5, 7):
+        raise template.TemplateSyntaxError("%r tag requires either 4 or 6 arguments." % args[0])
+
+    var_name = args[1]
+    attr = args[2]
+    if not (attr[0] == attr[-1] and attr[0] in ('"', "'")):
+        raise template.TemplateSyntaxError("%r tag's second argument should be in quotes." % args[0])
+    attr = attr[1:-1]
+
+    ALLOWED_ARGS = ['as', 'in']
+    kwargs = { 'template_directory': None, 'asvar': None }
+    tuples = zip(*[args[3:][i::2] for i in range(2)])
+    for k,v in tuples:
+        if not k in ALLOWED_ARGS:
+            raise template.TemplateSyntaxError("%r tag options arguments must be one of %s." % (args[0], ', '.join(ALLOWED_ARGS)))
+        if k == 'in':
+            kwargs['template_directory'] = v
+        if k == 'as':
+            kwargs['asvar'] = v
+    if kwargs['asvar'] is None:
+        raise template.TemplateSyntaxError("%r tag requires an 'as varname' argument." % args[0])
+
+    return BulkInlinesNode(var_name, attr, **kwargs)
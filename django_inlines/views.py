@@ -1,15 +1,90 @@
+import datetime
 from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
 from django.shortcuts import render_to_response
-from django.http import Http404
+from django.template.loader import render_to_string
+from django.http import Http404, HttpResponse
 from django.conf import settings
+from django.utils import simplejson
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import smart_str
+from django.utils.hashcompat import md5_constructor
+from django.views.decorators.http import condition
 
 from django_inlines import inlines
 
+# Documents built from the registry, by name, as (snapshot, content, etag,
+# last_modified) tuples for the registry snapshot they were built from.
+_documents = {}
 
-@staff_member_required
-def js_inline_config(request):
+
+def get_document(name, build):
+    """
+    Returns the (snapshot, content, etag, last_modified) of a document built
+    from the current registry by `build(snapshot)`. It's only built again
+    after the registry changes.
+
+    Last-Modified is the first time any process saw this version of the
+    document, so it's the same from every process sharing Django's cache.
+    """
+    snapshot = inlines.registry.snapshot
+    document = _documents.get(name)
+    if document is not None and document[0] is snapshot:
+        return document
+    content = build(snapshot)
+    etag = md5_constructor(smart_str(content)).hexdigest()
+    key = 'django_inlines.%s.%s' % (name, etag)
+    cache.add(key, datetime.datetime.utcnow().replace(microsecond=0), 60 * 60 * 24 * 30)
+    last_modified = cache.get(key) or datetime.datetime.utcnow().replace(microsecond=0)
+    document = _documents[name] = (snapshot, content, etag, last_modified)
+    return document
+
+
+def document_response(request, document, mimetype):
+    """
+    Serves a document from `get_document`. Requests for its current version,
+    given as ``?v=``, may be cached by the browser for
+    INLINES_JS_CONFIG_MAX_AGE seconds; others must be revalidated.
+    """
+    snapshot, content, etag, last_modified = document
+    response = HttpResponse(content, mimetype=mimetype)
+    if request.GET.get('v') == etag[:12]:
+        # Versioned URLs never change, so browsers can keep them.
+        patch_cache_control(response, private=True, max_age=getattr(settings, 'INLINES_JS_CONFIG_MAX_AGE', 60 * 60 * 24 * 365))
+    else:
+        patch_cache_control(response, private=True, must_revalidate=True, max_age=0)
+    return response
+
+
+def build_inline_schemas(snapshot):
+    schemas = []
+    for name, inline_cls in sorted(snapshot.classes.items()):
+        schema = {
+            'name': name,
+            'help_text': getattr(inline_cls, 'help_text', ''),
+            'variants': list(getattr(inline_cls, 'variants', [])),
+            'args': [],
+            'app_path': None,
+        }
+        for arg in getattr(inline_cls, 'inline_args', []):
+            schema['args'].append({
+                'name': arg['name'],
+                'help_text': arg.get('help_text', ''),
+                'options': list(arg.get('options', [])),
+            })
+        if hasattr(inline_cls, 'get_app_label') and getattr(inline_cls, 'model', None) is not None:
+            schema['app_path'] = inline_cls.get_app_label()
+        schemas.append(schema)
+    return simplejson.dumps({'inlines': schemas, 'admin_media_prefix': settings.ADMIN_MEDIA_PREFIX}, sort_keys=True)
+
+
+def get_inline_schemas():
+    return get_document('inline_schemas', build_inline_schemas)
+
+
+def build_js_inline_config(snapshot):
     registered = []
-    sorted_inlines = sorted(inlines.registry._registry.items())
+    sorted_inlines = sorted(snapshot.classes.items())
     for inline in sorted_inlines:
         d = {'name': inline[0]}
         inline_cls = inline[1]
@@ -20,7 +95,40 @@ def js_inline_config(request):
         if issubclass(inline_cls, inlines.ModelInline):
             d['app_path'] = "%s/%s" % (inline_cls.model._meta.app_label, inline_cls.model._meta.module_name)
         registered.append(d)
-    return render_to_response('admin/django_inlines/js_inline_config.js', { 'inlines': registered }, mimetype="text/javascript")
+    return render_to_string('admin/django_inlines/js_inline_config.js', {
+        'inlines': registered,
+        'inline_schemas_version': get_inline_schemas()[2][:12],
+    })
+
+
+def get_js_inline_config():
+    return get_document('js_inline_config', build_js_inline_config)
+
+
+def js_inline_config_version():
+    """
+    A short version string for the inline config that changes whenever the
+    config does. It's added to the config's URL by `InlineWidget`.
+    """
+    return get_js_inline_config()[2][:12]
+
+
+@staff_member_required
+@condition(etag_func=lambda request: get_js_inline_config()[2],
+           last_modified_func=lambda request: get_js_inline_config()[3])
+def js_inline_config(request):
+    return document_response(request, get_js_inline_config(), "text/javascript")
+
+@staff_member_required
+@condition(etag_func=lambda request: get_inline_schemas()[2],
+           last_modified_func=lambda request: get_inline_schemas()[3])
+def inline_schemas(request):
+    """
+    Every registered inline's form schema (help text, variants, arguments and
+    the admin path of its model) as one JSON document. The admin builds its
+    inline forms from it without asking the server again.
+    """
+    return document_response(request, get_inline_schemas(), "application/json")
 
 @staff_member_required
 def get_inline_form(request):
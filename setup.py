@@ -20,8 +20,10 @@ setup(
     packages = [
         'django_inlines',
         'django_inlines.templatetags',
+        'django_inlines.management',
+        'django_inlines.management.commands',
     ],
-    package_data={'django_inlines': ['templates/inlines/*.html', 'templates/admin/django_inlines/*.html', 'templates/admin/django_inlines/*.js', 'media/django_inlines/*.css', 'media/django_inlines/*.js']},
+    package_data={'django_inlines': ['templates/inlines/*.html', 'templates/admin/django_inlines/*.html', 'templates/admin/django_inlines/*.js', 'media/django_inlines/*.css', 'media/django_inlines/*.js', 'sql/*.sql']},
     classifiers = [
         'Development Status :: 4 - Beta',
         'Framework :: Django',
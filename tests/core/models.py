@@ -1,7 +1,25 @@
 from django.db import models
+from django_inlines.forms import InlineField
 
 class User(models.Model):
     name = models.CharField(max_length=255)
     title = models.CharField(blank=True, max_length=255)
     email = models.EmailField()
-    phone = models.CharField(blank=True, max_length=255)
\ No newline at end of file
+    phone = models.CharField(blank=True, max_length=255)
+
+
+class Place(models.Model):
+    name = models.CharField(max_length=255)
+
+    places = models.Manager()
+
+
+class Article(models.Model):
+    title = models.CharField(max_length=255)
+    body = InlineField(rendered_field='body_html')
+    body_html = models.TextField(blank=True, null=True, editable=False)
+
+
+class Page(models.Model):
+    slug = models.SlugField(primary_key=True)
+    body = InlineField()
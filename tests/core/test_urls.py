@@ -0,0 +1,6 @@
+from django.conf.urls.defaults import *
+
+
+urlpatterns = patterns('',
+    (r'^inlines/', include('django_inlines.admin_urls')),
+)
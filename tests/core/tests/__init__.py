@@ -2,3 +2,12 @@ from base import *
 from templateinline import *
 from modelinline import *
 from templatetags import *
+from cache import *
+from threaded import *
+from fields import *
+from stats import *
+from budget import *
+from views import *
+from index import *
+from reprocess import *
+from validation import *
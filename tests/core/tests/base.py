@@ -1,7 +1,10 @@
+import pickle
+import sys
+import threading
 import unittest
 from django.conf import settings
-from django_inlines.inlines import Registry, parse_inline, InlineUnparsableError
-from core.tests.test_inlines import DoubleInline, QuineInline, KeyErrorInline
+from django_inlines.inlines import Registry, parse_inline, InlineUnparsableError, InlineNotRegisteredError, InlineCall, ParsedInline
+from core.tests.test_inlines import DoubleInline, QuineInline, KeyErrorInline, CountingInline
 
 class ParserTestCase(unittest.TestCase):
 
@@ -25,6 +28,44 @@ class ParserTestCase(unittest.TestCase):
         OUT = ('with', '', {'variant': 'avariant'})
         self.assertEqual(parse_inline('with:avariant'), OUT)
 
+    def testParserEdgeCases(self):
+        OUT = ('with', 'a Zebra value', {'and': 'args'})
+        self.assertEqual(parse_inline('with a Zebra value and=args'), OUT)
+        OUT = ('with', 'a value None', {})
+        self.assertEqual(parse_inline('with a value None'), OUT)
+        OUT = ('with', 'a (value)+ [x] ?', {'and': 'args'})
+        self.assertEqual(parse_inline('with a (value)+ [x] ? and=args'), OUT)
+        OUT = ('with', 'a=b=c d= =e', {})
+        self.assertEqual(parse_inline('with a=b=c d= =e'), OUT)
+        OUT = ('with', 'a value', {'and': 'args', 'more': 'arg'})
+        self.assertEqual(parse_inline('with a value\tand=args  more=arg'), OUT)
+        self.assertRaises(InlineUnparsableError, parse_inline, 'Upper case')
+        self.assertRaises(InlineUnparsableError, parse_inline, ':variant')
+
+class ParsedInlineTestCase(unittest.TestCase):
+
+    def testFromSource(self):
+        parsed = ParsedInline.from_source("youtube:big asdf width=100 height=200")
+        self.assertEqual(parsed, ParsedInline("youtube:big asdf width=100 height=200", "youtube", "asdf", "big", (("height", "200"), ("width", "100"))))
+        self.assertEqual(parsed.name, "youtube")
+        self.assertEqual(parsed.value, "asdf")
+        self.assertEqual(parsed.variant, "big")
+        self.assertEqual(parsed.kwargs, (("height", "200"), ("width", "100")))
+        self.assertEqual(ParsedInline.from_source("234"), ParsedInline("234"))
+
+    def testImmutable(self):
+        parsed = ParsedInline.from_source("youtube asdf")
+        self.assertRaises(AttributeError, setattr, parsed, 'name', 'other')
+        self.assertRaises(AttributeError, setattr, parsed, 'anything', 1)
+
+    def testPickle(self):
+        parsed = Registry().parse("a {{ youtube asdf width=1 }} b")
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            unpickled = pickle.loads(pickle.dumps(parsed, protocol))
+            self.assertEqual(unpickled, parsed)
+            self.assertTrue(isinstance(unpickled[1], ParsedInline))
+            self.assertEqual(unpickled[1].text, "{{ youtube asdf width=1 }}")
+
 class RegistrySartEndTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -43,6 +84,88 @@ class RegistrySartEndTestCase(unittest.TestCase):
         OUT = """4 / 6"""
         self.assertEqual(self.inlines.process(IN), OUT)
 
+class RegistryInlineFinderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        self.inlines = inlines
+
+    def testFinderIsCached(self):
+        self.assertTrue(self.inlines.inline_finder is self.inlines.inline_finder)
+
+    def testFinderIsRebuiltOnTagChange(self):
+        finder = self.inlines.inline_finder
+        self.inlines.START_TAG = '<<'
+        self.assertFalse(self.inlines.inline_finder is finder)
+        finder = self.inlines.inline_finder
+        self.inlines.END_TAG = '>>'
+        self.assertFalse(self.inlines.inline_finder is finder)
+        self.assertEqual(self.inlines.process("<< double 2 >>"), "4")
+
+    def testTagsAreEscaped(self):
+        self.inlines.START_TAG = '[['
+        self.inlines.END_TAG = ']]'
+        IN = """[[ double 2 ]] / [[ double 2 multiplier=3 ]]"""
+        OUT = """4 / 6"""
+        self.assertEqual(self.inlines.process(IN), OUT)
+        self.inlines.START_TAG = '(('
+        self.inlines.END_TAG = '))'
+        self.assertEqual(self.inlines.process("(( double 2 ))"), "4")
+
+class RegistrySnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        self.inlines = inlines
+
+    def testSnapshotsAreSwapped(self):
+        snapshot = self.inlines.snapshot
+        self.inlines.register('quine', QuineInline)
+        self.assertFalse(self.inlines.snapshot is snapshot)
+        self.assertEqual(snapshot.get('quine'), None)
+        self.assertEqual(sorted(self.inlines._registry.keys()), ['double', 'quine'])
+        self.inlines.unregister('double')
+        self.assertEqual(sorted(snapshot.classes.keys()), ['double'])
+        self.assertEqual(sorted(self.inlines._registry.keys()), ['quine'])
+
+    def testAttributesAreResolved(self):
+        inline = self.inlines.snapshot.get('double')
+        self.assertTrue(inline.cls is DoubleInline)
+        self.assertEqual(inline.cacheable, False)
+        self.assertEqual(inline.threaded, False)
+        self.assertEqual(inline.model, None)
+
+    def testStaleCompiledContentIsRelinked(self):
+        IN = "{{ double 2 }} {{ quine }}"
+        compiled = self.inlines.compile(IN)
+        self.inlines.register('quine', QuineInline)
+        # As if a compile running alongside register had cached it late.
+        self.inlines.compiled_cache.set(self.inlines.compiled_cache.make_key(IN, '{{', '}}'), compiled)
+        self.assertEqual(self.inlines.process(IN), "4 {{ quine }}")
+
+    def testConcurrentRegistration(self):
+        errors = []
+        def churn():
+            try:
+                for i in range(200):
+                    self.inlines.register('quine', QuineInline)
+                    self.inlines.unregister('quine')
+            except Exception:
+                errors.append(sys.exc_info()[1])
+        threads = [threading.Thread(target=churn) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        # The second thread may find 'quine' already unregistered. Only
+        # unregister's own error is expected.
+        for i in range(200):
+            self.assertEqual(self.inlines.process("{{ double 2 }}"), "4")
+        for thread in threads:
+            thread.join()
+        for error in errors:
+            self.assertTrue(isinstance(error, InlineNotRegisteredError))
+
 class InlineTestCase(unittest.TestCase):
 
     def setUp(self):
@@ -105,4 +228,113 @@ class InlineTestCase(unittest.TestCase):
         """
         self.inlines.register('keyerror', KeyErrorInline)
         IN = "{{ keyerror fail! }}"
-        self.assertRaises(KeyError, self.inlines.process, IN)
\ No newline at end of file
+        self.assertRaises(KeyError, self.inlines.process, IN)
+
+class CompileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('quine', QuineInline)
+        inlines.register('double', DoubleInline)
+        self.inlines = inlines
+
+    def tearDown(self):
+        settings.INLINE_DEBUG = False
+
+    def testNodes(self):
+        compiled = self.inlines.compile("a {{ double:big 2 multiplier=3 }} b")
+        self.assertEqual(len(compiled.nodes), 3)
+        self.assertEqual(compiled.nodes[0], "a ")
+        self.assertEqual(compiled.nodes[2], " b")
+        call = compiled.nodes[1]
+        self.assertTrue(isinstance(call, InlineCall))
+        self.assertEqual(call.name, 'double')
+        self.assertEqual(call.value, '2')
+        self.assertEqual(call.variant, 'big')
+        self.assertEqual(call.get_kwargs(), {'multiplier': '3'})
+        self.assertTrue(call.cls is DoubleInline)
+        self.assertEqual(compiled.calls, (call,))
+
+    def testRenderIsRepeatable(self):
+        compiled = self.inlines.compile("{{ double 2 }} / {{ quine with=args }}")
+        OUT = "4 / {{ quine with=args }}"
+        self.assertEqual(compiled.render(), OUT)
+        self.assertEqual(compiled.render(), OUT)
+        self.assertEqual(self.inlines.process("{{ double 2 }} / {{ quine with=args }}"), OUT)
+
+    def testInlineFreeTextIsUntouched(self):
+        text = "Nothing to see here. Or } here."
+        self.assertTrue(self.inlines.process(text) is text)
+        self.assertEqual(self.inlines.compiled_cache.misses, 0)
+
+    def testErrorsAreRaisedAtRender(self):
+        compiled = self.inlines.compile("this {{ 234 }} and {{ should }} be removed")
+        self.assertEqual(compiled.render(), "this  and  be removed")
+        settings.INLINE_DEBUG = True
+        self.assertRaises(InlineUnparsableError, compiled.render)
+        compiled = self.inlines.compile("{{ should }}")
+        self.assertRaises(InlineNotRegisteredError, compiled.render)
+
+class ProcessManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        inlines.register('count', CountingInline)
+        self.inlines = inlines
+        CountingInline.renders = 0
+
+    def testOrder(self):
+        IN = ["{{ double 2 }}", "no inlines", "{{ double 3 }} {{ nothing }}"]
+        OUT = ["4", "no inlines", "6 "]
+        self.assertEqual(self.inlines.process_many(IN), OUT)
+
+    def testDuplicatesRenderOnce(self):
+        IN = ["{{ count a }} {{ count b }}", "{{ count  a }}", "{{ count a }}"]
+        self.assertEqual(self.inlines.process_many(IN), ["a b", "a", "a"])
+        self.assertEqual(CountingInline.renders, 2)
+
+    def testSharedRendered(self):
+        rendered = {}
+        compiled = self.inlines.compile("{{ count a }} {{ count a }}")
+        self.assertEqual(compiled.render(rendered=rendered), "a a")
+        self.assertEqual(rendered, {compiled.calls[0].key: "a"})
+        self.assertEqual(self.inlines.compile("{{ count a }}!").render(rendered=rendered), "a!")
+        self.assertEqual(CountingInline.renders, 1)
+
+    def testInlineFreeTextIsUntouched(self):
+        text = "no inlines"
+        self.assertTrue(self.inlines.process_many(iter(["{{ double 2 }}", text]))[1] is text)
+
+class IterProcessTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('quine', QuineInline)
+        inlines.register('double', DoubleInline)
+        self.inlines = inlines
+
+    def testChunksAreJoined(self):
+        IN = ["{{ dou", "ble 2 }", "} / {", "{ double 2 multiplier=3 }}", " {{ nothing }} end"]
+        self.assertEqual("".join(self.inlines.iter_process(IN)), "4 / 6  end")
+
+    def testUnterminatedStartTag(self):
+        self.inlines.max_inline_length = 50
+        chunks = ["{{ never closed "] + ["x" * 10] * 100 + [" {{ double 2 }}"]
+        fragments = list(self.inlines.iter_process(chunks))
+        self.assertEqual("".join(fragments), "{{ never closed " + "x" * 1000 + " 4")
+        # The unclosed start tag doesn't hold back the rest of the line.
+        self.assertTrue(max([len(fragment) for fragment in fragments]) < 100)
+
+    def testEverySplitPoint(self):
+        IN = """{{ double 2 }} / {{ quine with=args }}\n{{\n double 3 \n}} {{ 234 }} {{ double {{ double 4 }}}}} {"""
+        OUT = self.inlines.process(IN)
+        for i in range(len(IN) + 1):
+            for j in range(i, len(IN) + 1, 7):
+                chunks = [IN[:i], IN[i:j], IN[j:]]
+                self.assertEqual("".join(self.inlines.iter_process(chunks)), OUT)
+
+    def testFragmentsAreYieldedEarly(self):
+        fragments = self.inlines.iter_process(iter(["{{ double 2 }} and ", "{{ double", " 3 }}"]))
+        self.assertEqual(fragments.next(), "4 and ")
+        self.assertEqual(list(fragments), ["6"])
@@ -0,0 +1,62 @@
+import time
+import unittest
+from django.conf import settings
+from django_inlines.inlines import Registry, InlineBase, InlineBudgetError
+from test_inlines import DoubleInline
+
+
+class SleepyInline(InlineBase):
+    """
+    An inline that takes a while to render.
+    """
+    def render(self):
+        time.sleep(0.05)
+        return self.value
+
+
+class RenderBudgetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        inlines.register('sleepy', SleepyInline)
+        self.inlines = inlines
+
+    def tearDown(self):
+        settings.INLINE_DEBUG = False
+
+    def testMaxInlines(self):
+        self.inlines.max_inlines = 2
+        IN = "{{ double 1 }} {{ double 2 }} {{ double 3 }}"
+        self.assertEqual(self.inlines.process(IN), "2 4 ")
+        self.inlines.budget_fallback = 'raw'
+        self.assertEqual(self.inlines.process(IN), "2 4 {{ double 3 }}")
+        # The budget is per document.
+        self.assertEqual(self.inlines.process_many([IN, IN]), ["2 4 {{ double 3 }}", "2 4 {{ double 3 }}"])
+
+    def testRawFallbackKeepsTheOriginalText(self):
+        self.inlines.max_inlines = 1
+        self.inlines.budget_fallback = 'raw'
+        IN = "{{double 1}} {{double   2  }}\n{{  double 3}}"
+        self.assertEqual(self.inlines.process(IN), "2 {{double   2  }}\n{{  double 3}}")
+
+    def testMaxOutputSize(self):
+        self.inlines.max_output_size = 5
+        self.assertEqual(self.inlines.process("{{ double 1000 }} {{ double 1 }}"), "2000 ")
+
+    def testMaxRenderTime(self):
+        self.inlines.max_render_time = 0.01
+        self.assertEqual(self.inlines.process("{{ sleepy a }}{{ sleepy b }}{{ sleepy c }}"), "a")
+
+    def testStreamedDocumentsShareABudget(self):
+        self.inlines.max_inlines = 2
+        chunks = ["{{ double 1 }} ", "{{ double 2 }} ", "{{ double 3 }}"]
+        self.assertEqual(''.join(self.inlines.iter_process(chunks)), "2 4 ")
+
+    def testDebug(self):
+        self.inlines.max_inlines = 1
+        settings.INLINE_DEBUG = True
+        self.assertRaises(InlineBudgetError, self.inlines.process, "{{ double 1 }} {{ double 2 }}")
+
+    def testNoLimits(self):
+        self.assertEqual(self.inlines.get_budget(), None)
@@ -0,0 +1,96 @@
+import unittest
+from django_inlines.inlines import Registry
+from django_inlines.cache import LRUCache
+from django.template import Context
+from test_inlines import DoubleInline, QuineInline, CountingInline, CachedCountingInline
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertFalse('b' in cache)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def testCounters(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+        cache.clear()
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(len(cache), 0)
+
+    def testDisabled(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), None)
+
+
+class CompiledCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        self.inlines = inlines
+
+    def testCompileIsCached(self):
+        compiled = self.inlines.compile("{{ double 2 }}")
+        self.assertTrue(self.inlines.compile("{{ double 2 }}") is compiled)
+        self.assertEqual(self.inlines.compiled_cache.hits, 1)
+        self.assertEqual(self.inlines.compiled_cache.misses, 1)
+
+    def testTagsArePartOfTheKey(self):
+        compiled = self.inlines.compile("<< double 2 >>")
+        self.inlines.START_TAG = '<<'
+        self.inlines.END_TAG = '>>'
+        self.assertFalse(self.inlines.compile("<< double 2 >>") is compiled)
+        self.assertEqual(self.inlines.process("<< double 2 >>"), "4")
+
+    def testRegistryChangesInvalidate(self):
+        IN = "{{ double 2 }} {{ quine }}"
+        self.assertEqual(self.inlines.process(IN), "4 ")
+        self.inlines.register('quine', QuineInline)
+        self.assertEqual(self.inlines.process(IN), "4 {{ quine }}")
+        self.inlines.unregister('double')
+        self.assertEqual(self.inlines.process(IN), " {{ quine }}")
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.fragment_cache.use_django_cache = False
+        inlines.register('cached', CachedCountingInline)
+        self.inlines = inlines
+        CountingInline.renders = 0
+        CachedCountingInline.contexts = []
+
+    def testRenderedOnce(self):
+        self.assertEqual(self.inlines.process("{{ cached a }} {{ cached a }}"), "a a")
+        self.assertEqual(self.inlines.process("{{ cached  a }}"), "a")
+        self.assertEqual(CountingInline.renders, 1)
+        self.assertEqual(self.inlines.fragment_cache.hits, 2)
+
+    def testKeyIncludesArguments(self):
+        self.inlines.process("{{ cached a }} {{ cached:big a }} {{ cached a size=2 }}")
+        self.inlines.process("{{ cached a }}", template_dir="sidebar")
+        self.assertEqual(CountingInline.renders, 4)
+
+    def testContextIsNotPassed(self):
+        self.inlines.process("{{ cached a }}", context=Context({'a': 1}))
+        self.assertEqual(CachedCountingInline.contexts, [None])
+
+    def testRegistryChangesInvalidate(self):
+        self.inlines.process("{{ cached a }}")
+        self.inlines.register('double', DoubleInline)
+        self.inlines.process("{{ cached a }}")
+        self.assertEqual(CountingInline.renders, 2)
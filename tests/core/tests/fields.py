@@ -0,0 +1,55 @@
+from django.test import TestCase
+from django_inlines import inlines
+from test_inlines import UserInline
+from core.models import User, Article
+
+
+class RenderedInlineFieldTestCase(TestCase):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        self.old_registry = inlines.registry
+        inlines.registry = inlines.Registry()
+        inlines.registry.register('user', UserInline)
+
+    def tearDown(self):
+        inlines.registry = self.old_registry
+
+    def testRenderedOnSave(self):
+        article = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        self.assertEqual(article.body_html, "Xian and Evil Xian")
+        self.assertEqual(Article.objects.get(pk=article.pk).body_html, "Xian and Evil Xian")
+        self.assertEqual(article.get_body_rendered(), "Xian and Evil Xian")
+
+    def testDependentsAreCleared(self):
+        both = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        second = Article.objects.create(title="Second", body="{{ user:contact 2 }}")
+        user = User.objects.get(pk=1)
+        user.name = "Good Xian"
+        user.save()
+        self.assertEqual(Article.objects.get(pk=both.pk).body_html, None)
+        self.assertEqual(Article.objects.get(pk=second.pk).body_html, "Evil Xian, (666) 555-1212, ex@example.com")
+
+        both = Article.objects.get(pk=both.pk)
+        self.assertEqual(both.get_body_rendered(), "Good Xian and Evil Xian")
+        self.assertEqual(Article.objects.get(pk=both.pk).body_html, "Good Xian and Evil Xian")
+
+    def testEmptyRenderIsKept(self):
+        article = Article.objects.create(title="Empty", body="{{ user 99 }}")
+        self.assertEqual(Article.objects.get(pk=article.pk).body_html, "")
+        Article.objects.filter(pk=article.pk).update(body="changed without saving")
+        # An empty copy is a real render, not a cleared one.
+        self.assertEqual(Article.objects.get(pk=article.pk).get_body_rendered(), "")
+
+    def testUnrelatedSaveClearsNothing(self):
+        article = Article.objects.create(title="One", body="{{ user 1 }}")
+        User.objects.get(pk=2).save()
+        self.assertEqual(Article.objects.get(pk=article.pk).body_html, "Xian")
+
+    def testDeletedDependency(self):
+        article = Article.objects.create(title="Second", body="{{ user 2 }}!")
+        User.objects.get(pk=2).delete()
+        article = Article.objects.get(pk=article.pk)
+        self.assertEqual(article.body_html, None)
+        self.assertEqual(article.get_body_rendered(), "!")
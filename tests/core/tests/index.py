@@ -0,0 +1,78 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django_inlines import inlines
+from django_inlines.models import InlineOccurrence
+from test_inlines import UserInline
+from core.models import User, Article, Page
+
+
+class InlineOccurrenceIndexTestCase(TestCase):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        self.old_registry = inlines.registry
+        inlines.registry = inlines.Registry()
+        inlines.registry.register('user', UserInline)
+        self.old_index = getattr(settings, 'INLINES_OCCURRENCE_INDEX', False)
+        settings.INLINES_OCCURRENCE_INDEX = True
+
+    def tearDown(self):
+        inlines.registry = self.old_registry
+        settings.INLINES_OCCURRENCE_INDEX = self.old_index
+
+    def testIndexedOnSave(self):
+        article = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user:contact 2 }} {{ user 1 }} {{ unknown 1 }}")
+        occurrences = InlineOccurrence.objects.for_document(article)
+        self.assertEqual([(o.name, o.value, o.target_type, o.target_id) for o in occurrences.order_by('name', 'value')], [
+            ('unknown', '1', '', None),
+            ('user', '1', 'core.user', '1'),
+            ('user', '2', 'core.user', '2'),
+        ])
+        self.assertEqual(occurrences[0].field, 'body')
+
+    def testDocumentsUsing(self):
+        both = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        second = Article.objects.create(title="Second", body="{{ user:contact 2 }}")
+        self.assertEqual(InlineOccurrence.objects.documents_using(User.objects.get(pk=1)), [both])
+        self.assertEqual(InlineOccurrence.objects.documents_using(User.objects.get(pk=2), model=Article), [both, second])
+        self.assertEqual(InlineOccurrence.objects.document_ids((User, 2), Article, 'body'), [both.pk, second.pk])
+
+    def testTextPrimaryKeys(self):
+        about = Page.objects.create(slug='about', body="{{ user 1 }}")
+        Page.objects.create(slug='contact', body="{{ user:contact 2 }}")
+        article = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        self.assertEqual(InlineOccurrence.objects.documents_using(User.objects.get(pk=1)), [article, about])
+        self.assertEqual(InlineOccurrence.objects.document_ids((User, 2), Page), ['contact'])
+        self.assertEqual(InlineOccurrence.objects.document_ids((User, 2), Article), [article.pk])
+        self.assertEqual(InlineOccurrence.objects.for_document(about).count(), 1)
+
+    def testUpdatedOnChange(self):
+        article = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        article.body = "{{ user 2 }}"
+        article.save()
+        self.assertEqual(InlineOccurrence.objects.documents_using(User.objects.get(pk=1)), [])
+        self.assertEqual(InlineOccurrence.objects.for_document(article).count(), 1)
+        article.delete()
+        self.assertEqual(InlineOccurrence.objects.count(), 0)
+
+    def testDependentsAreClearedFromIndex(self):
+        both = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        second = Article.objects.create(title="Second", body="{{ user:contact 2 }}")
+        # Dependents are found through the index, not the text.
+        InlineOccurrence.objects.for_document(both).delete()
+        User.objects.get(pk=2).save()
+        self.assertEqual(Article.objects.get(pk=both.pk).body_html, "Xian and Evil Xian")
+        self.assertEqual(Article.objects.get(pk=second.pk).body_html, None)
+
+    def testRebuild(self):
+        both = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        Article.objects.create(title="None", body="No inlines")
+        # As if the articles had been saved before there was an index.
+        InlineOccurrence.objects.all().delete()
+        call_command('rebuild_inline_index', 'core.Article', batch_size=1, verbosity=0)
+        self.assertEqual(InlineOccurrence.objects.documents_using(User.objects.get(pk=1)), [both])
+        self.assertEqual(InlineOccurrence.objects.count(), 2)
+        call_command('rebuild_inline_index', verbosity=0)
+        self.assertEqual(InlineOccurrence.objects.count(), 2)
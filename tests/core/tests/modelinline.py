@@ -61,3 +61,92 @@ class InlineForModelTestCase(TestCase):
 
     def testInlineForModelBadInput(self):
         self.assertRaises(ValueError, inline_for_model, "User")
+
+class PrefetchModelInlineTestCase(TestCase):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('user', UserInline)
+        inlines.register('person', inline_for_model(User))
+        self.inlines = inlines
+
+    def tearDown(self):
+        settings.INLINE_DEBUG = False
+
+    def testPrefetchGroupsByModel(self):
+        first = self.inlines.compile("{{ user 1 }} {{ person 2 }} {{ user asdf }}")
+        second = self.inlines.compile("{{ user:contact 2 }} {{ user 111 }}")
+        objects = self.inlines.prefetch([first, second])
+        self.assertEqual(objects.keys(), [User])
+        self.assertEqual(sorted(objects[User].keys()), [1, 2])
+
+    def testRenderUsesPreloadedObjects(self):
+        compiled = self.inlines.compile("{{ user 1 }} vs {{ person 1 }}")
+        objects = {User: {1: User(pk=1, name="Preloaded")}}
+        self.assertEqual(compiled.render(objects=objects), "Preloaded vs Preloaded")
+
+    def testMissingPreloadedObject(self):
+        compiled = self.inlines.compile("{{ user 2 }}")
+        objects = {User: {1: User(pk=1, name="Preloaded")}}
+        self.assertEqual(compiled.render(objects=objects), "")
+        settings.INLINE_DEBUG = True
+        self.assertRaises(InlineInputError, compiled.render, objects=objects)
+
+    def testPrefetchedRender(self):
+        compiled = self.inlines.compile("{{ user 1 }} vs {{ person 2 }} vs {{ user 111 }}")
+        self.assertEqual(compiled.render(objects=self.inlines.prefetch(compiled)), "Xian vs Evil Xian vs ")
+
+
+class CachedModelInlineTestCase(TestCase):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.fragment_cache.use_django_cache = True
+        inlines.register('user', inline_for_model(User, cacheable=True))
+        self.inlines = inlines
+
+    def tearDown(self):
+        # Fragments in Django's cache outlive the test's database.
+        for user in User.objects.all():
+            self.inlines.fragment_cache.evict(User, user.pk)
+
+    def testSavingEvicts(self):
+        self.assertEqual(self.inlines.process("{{ user 1 }} vs {{ user 2 }}"), "Xian vs Evil Xian")
+        user = User.objects.get(pk=1)
+        user.name = "Good Xian"
+        user.save()
+        self.assertFalse((User, 1) in self.inlines.fragment_cache.dependents)
+        self.assertTrue((User, 2) in self.inlines.fragment_cache.dependents)
+        self.assertEqual(self.inlines.process("{{ user 1 }} vs {{ user 2 }}"), "Good Xian vs Evil Xian")
+        self.assertTrue((User, 1) in self.inlines.fragment_cache.dependents)
+
+    def testDeletingEvicts(self):
+        self.assertEqual(self.inlines.process("{{ user 2 }}"), "Evil Xian")
+        User.objects.get(pk=2).delete()
+        self.assertEqual(self.inlines.process("{{ user 2 }}"), "")
+
+    def testVersionIsPartOfTheKey(self):
+        self.assertEqual(self.inlines.process("{{ user 1 }}"), "Xian")
+        User.objects.filter(pk=1).update(name="Good Xian")
+        released = Registry()
+        released.fragment_cache.use_django_cache = True
+        released.fragment_cache.version = '2'
+        released.register('user', inline_for_model(User, cacheable=True))
+        self.assertEqual(released.process("{{ user 1 }}"), "Good Xian")
+
+    def testOtherProcessesSeeEviction(self):
+        self.inlines.fragment_cache.local.clear()
+        self.assertEqual(self.inlines.process("{{ user 1 }}"), "Xian")
+        other = Registry()
+        other.fragment_cache.use_django_cache = True
+        other.register('user', inline_for_model(User, cacheable=True))
+        User.objects.filter(pk=1).update(name="Good Xian")
+        # The other registry finds the fragment in Django's cache.
+        self.assertEqual(other.process("{{ user 1 }}"), "Xian")
+        other.fragment_cache.local.clear()
+        self.inlines.fragment_cache.evict(User, 1)
+        self.assertEqual(other.process("{{ user 1 }}"), "Good Xian")
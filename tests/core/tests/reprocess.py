@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django_inlines import inlines
+from django_inlines.reprocess import pk_ranges, reprocess_range
+from test_inlines import UserInline
+from core.models import User, Article
+
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+class ReprocessSetUp(object):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        self.old_registry = inlines.registry
+        inlines.registry = inlines.Registry()
+        inlines.registry.register('user', UserInline)
+        self.both = Article.objects.create(title="Both", body="{{ user 1 }} and {{ user 2 }}")
+        self.missing = Article.objects.create(title="Missing", body="{{ user 1 }} and {{ user 99 }}")
+        self.plain = Article.objects.create(title="Plain", body="No inlines")
+        # Changed without sending signals, so the rendered copies are stale.
+        User.objects.filter(pk=1).update(name="Good Xian")
+
+    def tearDown(self):
+        inlines.registry = self.old_registry
+
+
+class ReprocessTestCase(ReprocessSetUp, TestCase):
+
+    def testPkRanges(self):
+        pks = [self.both.pk, self.missing.pk, self.plain.pk]
+        self.assertEqual(list(pk_ranges(Article, 2)), [(pks[0], pks[1]), (pks[2], pks[2])])
+        self.assertEqual(list(pk_ranges(Article, 10)), [(pks[0], pks[2])])
+
+    def testDryRun(self):
+        result = reprocess_range(('core.article', 'body', self.both.pk, self.plain.pk, True))
+        self.assertEqual(result, {'documents': 3, 'inlines': 4, 'errors': 1, 'updated': 0})
+        self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Xian and Evil Xian")
+
+    def testReprocessRange(self):
+        result = reprocess_range(('core.article', 'body', self.both.pk, self.missing.pk, False))
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Good Xian and Evil Xian")
+        self.assertEqual(Article.objects.get(pk=self.missing.pk).body_html, "Good Xian and ")
+        result = reprocess_range(('core.article', 'body', self.both.pk, self.missing.pk, False))
+        self.assertEqual(result['updated'], 0)
+
+    def testCommand(self):
+        call_command('reprocess_inlines', 'core.Article.body', processes=1, batch_size=1, dry_run=True, verbosity=0)
+        self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Xian and Evil Xian")
+        call_command('reprocess_inlines', processes=1, batch_size=1, verbosity=0)
+        self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Good Xian and Evil Xian")
+        self.assertEqual(Article.objects.get(pk=self.plain.pk).body_html, "No inlines")
+
+
+if multiprocessing is not None:
+
+    class ParallelReprocessTestCase(ReprocessSetUp, unittest.TestCase):
+        """
+        Runs the command with worker processes. The workers open their own
+        connections, so they can't see the in-memory test database. The test
+        switches to a database in a temporary file, and puts the in-memory one
+        back afterwards.
+        """
+
+        def setUp(self):
+            self.old_connection = connection.connection
+            self.old_name = connection.settings_dict['DATABASE_NAME']
+            handle, self.database = tempfile.mkstemp(suffix='.db')
+            os.close(handle)
+            connection.connection = None
+            connection.settings_dict['DATABASE_NAME'] = self.database
+            call_command('syncdb', verbosity=0, interactive=False)
+            call_command('loaddata', *self.fixtures, **{'verbosity': 0})
+            ReprocessSetUp.setUp(self)
+
+        def tearDown(self):
+            ReprocessSetUp.tearDown(self)
+            connection.close()
+            connection.settings_dict['DATABASE_NAME'] = self.old_name
+            connection.connection = self.old_connection
+            os.remove(self.database)
+
+        def testWorkers(self):
+            call_command('reprocess_inlines', 'core.Article.body', processes=2, batch_size=1, dry_run=True, verbosity=0)
+            self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Xian and Evil Xian")
+            call_command('reprocess_inlines', processes=2, batch_size=1, verbosity=0)
+            self.assertEqual(Article.objects.get(pk=self.both.pk).body_html, "Good Xian and Evil Xian")
+            self.assertEqual(Article.objects.get(pk=self.missing.pk).body_html, "Good Xian and ")
+            self.assertEqual(Article.objects.get(pk=self.plain.pk).body_html, "No inlines")
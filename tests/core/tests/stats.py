@@ -0,0 +1,86 @@
+import unittest
+from django_inlines.inlines import Registry, InlineNotRegisteredError
+from django_inlines.signals import inline_rendered
+from django_inlines.stats import StatsCollector, InlineStats, load_published
+from test_inlines import DoubleInline
+
+
+class InlineStatsTestCase(unittest.TestCase):
+
+    def testPercentiles(self):
+        stats = InlineStats()
+        for i in range(1, 101):
+            stats.add(i / 1000.0)
+        self.assertEqual(stats.count, 100)
+        self.assertEqual(stats.percentile(50), 0.051)
+        self.assertEqual(stats.percentile(99), 0.099)
+        self.assertEqual(stats.max_time, 0.1)
+
+    def testSampleIsBounded(self):
+        stats = InlineStats(sample_size=10)
+        for i in range(100):
+            stats.add(0.001)
+        self.assertEqual(len(stats.samples), 10)
+        self.assertEqual(stats.count, 100)
+
+    def testMerge(self):
+        stats = InlineStats()
+        stats.add(0.5, queries=2, error=InlineNotRegisteredError())
+        merged = InlineStats()
+        merged.add(0.1)
+        merged.merge(stats.as_dict())
+        self.assertEqual(merged.count, 2)
+        self.assertEqual(merged.queries, 2)
+        self.assertEqual(merged.errors, {'InlineNotRegisteredError': 1})
+        self.assertEqual(merged.max_time, 0.5)
+
+
+class RegistryStatsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('double', DoubleInline)
+        inlines.stats = StatsCollector(publish_interval=None)
+        self.inlines = inlines
+
+    def testCountsAndErrors(self):
+        self.inlines.process("{{ double 1 }} {{ double 2 }} {{ missing 3 }} {{ missing 4 }}")
+        stats = self.inlines.stats.inlines
+        self.assertEqual(stats['double'].count, 2)
+        self.assertEqual(stats['double'].errors, {})
+        self.assertEqual(stats['missing'].count, 2)
+        self.assertEqual(stats['missing'].errors, {'InlineNotRegisteredError': 2})
+
+    def testSignal(self):
+        sent = []
+        def receiver(sender, name, error, **kwargs):
+            sent.append((name, error.__class__.__name__))
+        inline_rendered.connect(receiver)
+        try:
+            self.inlines.stats = None
+            self.inlines.process("{{ double 1 }} {{ missing 3 }}")
+        finally:
+            inline_rendered.disconnect(receiver)
+        self.assertEqual(sent, [('double', 'NoneType'), ('missing', 'InlineNotRegisteredError')])
+
+    def testPublish(self):
+        self.inlines.process("{{ double 1 }}")
+        self.inlines.stats.publish()
+        published = load_published()
+        self.assertTrue(published['double'].count >= 1)
+
+    def testPublishersKeepTheirSlots(self):
+        first = StatsCollector(publish_interval=0)
+        first.key += '.first'
+        second = StatsCollector(publish_interval=0)
+        second.key += '.second'
+        first.record('double', 0.5)
+        second.record('double', 0.25)
+        first.publish()
+        second.publish()
+        first.publish()
+        self.assertNotEqual(first.slot, None)
+        self.assertNotEqual(first.slot, second.slot)
+        published = load_published()
+        self.assertEqual(published['double'].max_time, 0.5)
+        self.assertTrue(published['double'].count >= 2)
@@ -1,8 +1,23 @@
 import unittest
-from django_inlines.inlines import Registry
+from django.template import Context, TemplateDoesNotExist
+from django_inlines.inlines import Registry, TemplateInline
 from django_inlines.samples import YoutubeInline
 
 
+class MissingTemplateInline(TemplateInline):
+    def get_context(self):
+        return {}
+
+
+class GreetingInline(TemplateInline):
+    def get_context(self):
+        return {'name': self.value}
+
+
+class FlatGreetingInline(GreetingInline):
+    inherit_context = ['greeting']
+
+
 class YoutubeTestCase(unittest.TestCase):
     
     def setUp(self):
@@ -20,3 +35,78 @@ class YoutubeTestCase(unittest.TestCase):
         IN = """{{ youtube http://www.youtube.com/watch?v=RXJKdh1KZ0w&hd=1&feature=hd }}"""
         OUT = """<div class="youtube_video">\n<object width="480" height="295">\n  <param name="movie" value="http://www.youtube.com/v/RXJKdh1KZ0w&hl=en&fs=1"></param>\n  <param name="allowFullScreen" value="true"></param>\n  <param name="allowscriptaccess" value="always"></param>\n  <embed src="http://www.youtube.com/v/RXJKdh1KZ0w&hl=en&fs=1" type="application/x-shockwave-flash" allowscriptaccess="always" allowfullscreen="true" width="480" height="295"></embed>\n</object>  \n</div>\n"""
         self.assertEqual(self.inlines.process(IN), OUT)
+
+
+class TemplateCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('youtube', YoutubeInline)
+        inlines.register('missing', MissingTemplateInline)
+        self.inlines = inlines
+
+    def testTemplatesAreCached(self):
+        IN = """{{ youtube:hd RXJKdh1KZ0w }}"""
+        OUT = self.inlines.process(IN, template_dir='youtube_inlines')
+        self.assertEqual(len(self.inlines.template_cache), 1)
+        self.assertEqual(self.inlines.process(IN, template_dir='youtube_inlines'), OUT)
+        self.assertEqual(self.inlines.template_cache.hits, 1)
+        self.assertEqual(OUT, """<div class="youtube_video">\nRXJKdh1KZ0w\n</div>\n""")
+
+    def testMissingTemplatesAreCached(self):
+        self.assertRaises(TemplateDoesNotExist, self.inlines.process, "{{ missing }}")
+        self.assertRaises(TemplateDoesNotExist, self.inlines.process, "{{ missing }}")
+        self.assertEqual(self.inlines.template_cache.hits, 1)
+
+    def testDisabled(self):
+        self.inlines.template_cache = None
+        IN = """{{ youtube RXJKdh1KZ0w }}"""
+        self.assertEqual(self.inlines.process(IN), self.inlines.process(IN))
+        self.assertRaises(TemplateDoesNotExist, self.inlines.process, "{{ missing }}")
+
+
+class SlotsTestCase(unittest.TestCase):
+
+    def testNoInstanceDict(self):
+        inline = YoutubeInline('RXJKdh1KZ0w', template_dir='youtube_inlines')
+        self.assertFalse(hasattr(inline, '__dict__'))
+        self.assertEqual(inline.template_dirs, ['youtube_inlines', 'inlines'])
+
+    def testTemplateDirsAreAList(self):
+        # Subclasses may add their own directories.
+        inline = YoutubeInline('RXJKdh1KZ0w', template_dir='youtube_inlines')
+        inline.template_dirs.insert(0, 'site')
+        self.assertEqual(inline.template_dirs, ['site', 'youtube_inlines', 'inlines'])
+        self.assertEqual(YoutubeInline('asdf', template_dir='youtube_inlines').template_dirs, ['youtube_inlines', 'inlines'])
+
+    def testSubclassesWithoutSlots(self):
+        inline = GreetingInline('Bob')
+        inline.anything = 1
+        self.assertEqual(inline.template_dirs, ['inlines'])
+
+
+class RenderContextTestCase(unittest.TestCase):
+
+    def setUp(self):
+        inlines = Registry()
+        inlines.register('greeting', GreetingInline)
+        self.inlines = inlines
+
+    def testParentContextIsInherited(self):
+        context = Context({'greeting': 'Hi', 'secret': '!'})
+        self.assertEqual(self.inlines.process("{{ greeting:loud Bob }}", context=context), "Hi, Bob (loud)!")
+        self.assertEqual(self.inlines.process("{{ greeting Bob }}"), "Hello, Bob")
+
+    def testParentContextIsUnchanged(self):
+        context = Context({'greeting': 'Hi'})
+        dicts = context.dicts[:]
+        self.inlines.process("{{ greeting Bob }} {{ greeting:loud Ann secret=x }}", context=context)
+        self.assertEqual(context.dicts, dicts)
+        self.assertRaises(KeyError, context.__getitem__, 'name')
+
+    def testInheritContext(self):
+        self.inlines.register('greeting', FlatGreetingInline)
+        context = Context({'greeting': 'Howdy', 'secret': '!'})
+        # Only `greeting` is taken from the parent context, not `secret`.
+        self.assertEqual(self.inlines.process("{{ greeting Bob }}", context=context), "Howdy, Bob")
+        self.assertEqual(self.inlines.process("{{ greeting Bob secret=x }}", context=context), "Howdy, Bobx")
@@ -1,5 +1,5 @@
 from django.test import TestCase
-from django.template import Template, Context
+from django.template import Template, Context, TemplateSyntaxError
 from django_inlines import inlines
 from django_inlines.samples import YoutubeInline
 from django_inlines.templatetags.inlines import stripinlines
@@ -20,6 +20,10 @@ class StripInlinesTestCase(TestCase):
         IN = "This is my YouTube video: {{ youtube C_ZebDKv1zo }}"
         self.assertEqual(stripinlines(IN), "This is my YouTube video: ")
 
+    def test_inline_free_text_is_untouched(self):
+        IN = u"No inlines here."
+        self.assertTrue(stripinlines(IN) is IN)
+
     def test_simple_usage(self):
         inlines.registry.register('youtube', YoutubeInline)
 
@@ -146,3 +150,45 @@ class ProcessInlinesTestCase(TestCase):
             'body': u"This is my YouTube video: {{ youtube C_ZebDKv1zo }}",
         }
         self.assertEqual(self.render(template, context), u'<p>This is my YouTube video: <div class="youtube_video">\n<object width="480" height="295">\n  <param name="movie" value="http://www.youtube.com/v/C_ZebDKv1zo&hl=en&fs=1"></param>\n  <param name="allowFullScreen" value="true"></param>\n  <param name="allowscriptaccess" value="always"></param>\n  <embed src="http://www.youtube.com/v/C_ZebDKv1zo&hl=en&fs=1" type="application/x-shockwave-flash" allowscriptaccess="always" allowfullscreen="true" width="480" height="295"></embed>\n</object>  \n</div>\n</p>')
+
+
+class ProcessInlinesBulkTestCase(TestCase):
+    def render(self, template_string, context_dict=None):
+        """A shortcut for testing template output."""
+        if context_dict is None:
+            context_dict = {}
+
+        c = Context(context_dict)
+        t = Template(template_string)
+        return t.render(c)
+
+    def setUp(self):
+        super(ProcessInlinesBulkTestCase, self).setUp()
+        self.old_registry = inlines.registry
+        inlines.registry = inlines.Registry()
+        inlines.registry.register('quine', QuineInline)
+        inlines.registry.register('double', DoubleInline)
+
+    def tearDown(self):
+        inlines.registry = self.old_registry
+        super(ProcessInlinesBulkTestCase, self).tearDown()
+
+    def test_simple_usage(self):
+        template = u"{% load inlines %}{% process_inlines_bulk entries 'body' as bodies %}{% for body in bodies %}<p>{{ body }}</p>{% endfor %}"
+        context = {
+            'entries': [{'body': u"{{ double 2 }}"}, {'body': u"Some {{ quine }}"}],
+        }
+        self.assertEqual(self.render(template, context), u'<p>4</p><p>Some {{ quine }}</p>')
+
+    def test_template_dir(self):
+        inlines.registry.register('youtube', YoutubeInline)
+        template = u"{% load inlines %}{% process_inlines_bulk entries 'body' in 'youtube_inlines' as bodies %}{{ bodies.0|safe }}"
+        context = {
+            'entries': [{'body': u"{{ youtube C_ZebDKv1zo }}"}],
+        }
+        self.assertEqual(self.render(template, context), u'<div class="youtube_video">\nC_ZebDKv1zo\n</div>\n')
+
+    def test_syntax_errors(self):
+        self.assertRaises(TemplateSyntaxError, self.render, u"{% load inlines %}{% process_inlines_bulk entries 'body' %}")
+        self.assertRaises(TemplateSyntaxError, self.render, u"{% load inlines %}{% process_inlines_bulk entries body as bodies %}")
+        self.assertRaises(TemplateSyntaxError, self.render, u"{% load inlines %}{% process_inlines_bulk entries 'body' in 'x' in 'y' %}")
@@ -48,6 +48,30 @@ class KeyErrorInline(InlineBase):
         return empty['this will fail']
 
 
+class CountingInline(InlineBase):
+    """
+    An inline that counts how many times it's been rendered.
+    """
+    renders = 0
+
+    def render(self):
+        CountingInline.renders += 1
+        return self.value
+
+
+class CachedCountingInline(CountingInline):
+    """
+    A cacheable inline that counts how many times it's been rendered and
+    whether it was given a context.
+    """
+    cacheable = True
+    contexts = []
+
+    def __init__(self, value, variant=None, context=None, template_dir="", **kwargs):
+        super(CachedCountingInline, self).__init__(value, variant=variant, context=context, template_dir=template_dir, **kwargs)
+        CachedCountingInline.contexts.append(context)
+
+
 class UserInline(ModelInline):
     """
     A inline for the mock user model.
@@ -0,0 +1,105 @@
+import time
+import unittest
+from django.conf import settings
+from django.template import Context
+from django_inlines.inlines import Registry, InlineBase, InlineTimeoutError, futures
+from django_inlines.stats import StatsCollector
+from test_inlines import DoubleInline
+
+
+class SlowInline(InlineBase):
+    """
+    An inline that waits on a pretend remote service.
+    """
+    threaded = True
+
+    def render(self):
+        time.sleep(0.1)
+        return self.value
+
+
+class TooSlowInline(SlowInline):
+    render_timeout = 0.01
+
+
+class PacedInline(SlowInline):
+    render_timeout = 0.15
+
+
+class ContextInline(InlineBase):
+    """
+    An inline that pushes onto the context it's given.
+    """
+    threaded = True
+
+    def __init__(self, value, variant=None, context=None, template_dir="", **kwargs):
+        super(ContextInline, self).__init__(value, variant=variant, context=context, template_dir=template_dir, **kwargs)
+        self.context = context
+
+    def render(self):
+        self.context.update({'value': self.value})
+        time.sleep(0.05)
+        return self.context['value']
+
+
+if futures is not None:
+
+    class ThreadedRenderingTestCase(unittest.TestCase):
+
+        def setUp(self):
+            inlines = Registry()
+            inlines.thread_pool_size = 4
+            inlines.register('slow', SlowInline)
+            inlines.register('tooslow', TooSlowInline)
+            inlines.register('paced', PacedInline)
+            inlines.register('context', ContextInline)
+            inlines.register('double', DoubleInline)
+            self.inlines = inlines
+
+        def tearDown(self):
+            settings.INLINE_DEBUG = False
+
+        def testConcurrentRendering(self):
+            IN = "{{ slow a }} {{ double 2 }} {{ slow b }} {{ slow c }} {{ slow d }}"
+            started = time.time()
+            self.assertEqual(self.inlines.process(IN), "a 4 b c d")
+            self.assertTrue(time.time() - started < 0.3)
+
+        def testTimeout(self):
+            self.assertEqual(self.inlines.process("{{ tooslow a }}!"), "!")
+            settings.INLINE_DEBUG = True
+            self.assertRaises(InlineTimeoutError, self.inlines.process, "{{ tooslow a }}!")
+
+        def testTimeoutCountedOnce(self):
+            self.inlines.stats = StatsCollector(publish_interval=None)
+            self.assertEqual(self.inlines.process("{{ tooslow a }}!"), "!")
+            # Let the worker finish the render it was given up on.
+            time.sleep(0.15)
+            stats = self.inlines.stats.inlines['tooslow']
+            self.assertEqual(stats.count, 1)
+            self.assertEqual(stats.errors, {'InlineTimeoutError': 1})
+
+        def testTimeoutStartsWhenRunning(self):
+            # With one thread the last call waits 0.2s before it starts,
+            # longer than its timeout, and still renders.
+            self.inlines.thread_pool_size = 1
+            self.assertEqual(self.inlines.process("{{ paced a }}{{ paced b }}{{ paced c }}"), "abc")
+
+        def testHungRendersAreCounted(self):
+            self.inlines.thread_pool_size = 1
+            self.assertEqual(self.inlines.process("{{ tooslow a }}!"), "!")
+            self.assertEqual(self.inlines.hung_renders, 1)
+            # The only thread is busy, so this renders in the calling thread.
+            self.assertEqual(self.inlines.process("{{ slow b }}"), "b")
+            time.sleep(0.15)
+            self.assertEqual(self.inlines.hung_renders, 0)
+
+        def testContextIsolation(self):
+            context = Context({'value': 'outer'})
+            self.assertEqual(self.inlines.process("{{ context a }} {{ context b }}", context=context), "a b")
+            self.assertEqual(context['value'], 'outer')
+
+        def testDisabled(self):
+            self.inlines.thread_pool_size = 0
+            self.assertEqual(self.inlines.process("{{ slow a }} {{ double 2 }}"), "a 4")
+            self.assertTrue(self.inlines.get_executor() is None)
@@ -0,0 +1,99 @@
+import sys
+from django import forms
+from django.test import TestCase
+from django_inlines import inlines
+from django_inlines.forms import InlineFormField, InlineWidget
+from django_inlines.samples import YoutubeInline
+from test_inlines import UserInline
+from core.models import Article, Place
+
+
+class SizedInline(inlines.InlineBase):
+    variants = ['small', 'large']
+    inline_args = [
+        dict(name='align', options=['left', 'right']),
+        dict(name='caption'),
+    ]
+
+    def render(self):
+        return self.value
+
+
+class ValidationTestCase(TestCase):
+
+    fixtures = ['users']
+
+    def setUp(self):
+        self.old_registry = inlines.registry
+        inlines.registry = inlines.Registry()
+        inlines.registry.register('user', UserInline)
+        inlines.registry.register('youtube', YoutubeInline)
+        inlines.registry.register('sized', SizedInline)
+
+    def tearDown(self):
+        inlines.registry = self.old_registry
+
+    def messages(self, text):
+        return [(node.source, message) for node, message in inlines.registry.validate(text)]
+
+    def testValid(self):
+        self.assertEqual(self.messages("No inlines"), [])
+        self.assertEqual(self.messages("{{ user 1 }} {{ user:contact 2 }} {{ youtube abc width=400 }} {{ sized:small x align=left caption=Hi }}"), [])
+
+    def testInvalid(self):
+        self.assertEqual(self.messages("{{ nothing 1 }}"), [('nothing 1', '"nothing" was not found as a registered inline')])
+        self.assertEqual(self.messages("{{ 1 }}"), [('1', 'it could not be parsed')])
+        self.assertEqual(self.messages("{{ sized:huge x }}"), [('sized:huge x', '"huge" is not a variant of sized')])
+        self.assertEqual(self.messages("{{ sized x size=2 }}"), [('sized x size=2', '"size" is not an argument of sized')])
+        self.assertEqual(self.messages("{{ sized x align=middle }}"), [('sized x align=middle', '"middle" is not a valid value for align')])
+        self.assertEqual(self.messages("{{ youtube abc depth=3 }}"), [('youtube abc depth=3', '"depth" is not an argument of youtube')])
+        self.assertEqual(self.messages("{{ user one }}"), [('user one', "'one' could not be converted to an int")])
+
+    def testMissingObjects(self):
+        self.assertEqual(self.messages("{{ user 1 }} {{ user 99 }} {{ user:contact 99 }} {{ user 98 }}"), [
+            ('user 99', "'99' could not be found in core.user"),
+            ('user:contact 99', "'99' could not be found in core.user"),
+            ('user 98', "'98' could not be found in core.user"),
+        ])
+
+    def testErrorsInDocumentOrder(self):
+        self.assertEqual(self.messages("{{ user 99 }} {{ nothing }} {{ user 1 }} {{ sized:huge x }} {{ user 98 }}"), [
+            ('user 99', "'99' could not be found in core.user"),
+            ('nothing', '"nothing" was not found as a registered inline'),
+            ('sized:huge x', '"huge" is not a variant of sized'),
+            ('user 98', "'98' could not be found in core.user"),
+        ])
+
+    def testDefaultManager(self):
+        inlines.registry.register('place', inlines.inline_for_model(Place))
+        place = Place.places.create(name="Here")
+        self.assertEqual(self.messages("{{ place %s }}" % place.pk), [])
+        self.assertEqual(self.messages("{{ place %s }}" % (place.pk + 1)), [('place %s' % (place.pk + 1), "'%s' could not be found in core.place" % (place.pk + 1))])
+
+    def testNormalize(self):
+        registry = inlines.registry
+        text = "A {{user:contact    2}} and {{ sized  x  y caption=Hi align=left }} {{ 1 }}"
+        normalized = registry.normalize(text)
+        self.assertEqual(normalized, "A {{ user:contact 2 }} and {{ sized x  y align=left caption=Hi }} {{ 1 }}")
+        self.assertEqual(registry.process(normalized), registry.process(text))
+        self.assertEqual(registry.normalize("No inlines"), "No inlines")
+
+    def testFormField(self):
+        field = InlineFormField()
+        self.assertEqual(field.clean("Hi {{user   1}}"), "Hi {{ user 1 }}")
+        try:
+            field.clean("{{ user 99 }} and {{ nothing }}")
+        except forms.ValidationError:
+            self.assertEqual(sys.exc_info()[1].messages, [
+                u"{{ user 99 }}: '99' could not be found in core.user",
+                u'{{ nothing }}: "nothing" was not found as a registered inline',
+            ])
+        else:
+            self.fail("ValidationError wasn't raised")
+
+    def testModelFormField(self):
+        field = Article._meta.get_field('body').formfield(required=False)
+        self.failUnless(isinstance(field, InlineFormField))
+        self.failUnless(isinstance(field.widget, InlineWidget))
+        self.assertEqual(field.required, False)
+        self.assertEqual(field.clean(""), "")
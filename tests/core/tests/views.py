@@ -0,0 +1,127 @@
+import unittest
+from django.contrib.auth.models import User as StaffUser
+from django.test import TestCase
+from django.utils import simplejson
+from django_inlines import inlines as inlines_module
+from django_inlines.forms import DelayedUrlReverse, js_inline_config_version
+from django_inlines.inlines import Registry, inline_for_model
+from django_inlines.samples import YoutubeInline
+from django_inlines.views import build_inline_schemas, get_js_inline_config, get_inline_schemas
+from core.models import User
+
+
+class InlineSchemasTestCase(unittest.TestCase):
+
+    def testSchemas(self):
+        inlines = Registry()
+        inlines.register('youtube', YoutubeInline)
+        inlines.register('user', inline_for_model(User, variants=['contact']))
+        schemas = simplejson.loads(build_inline_schemas(inlines.snapshot))['inlines']
+        self.assertEqual([schema['name'] for schema in schemas], ['user', 'youtube'])
+        user, youtube = schemas
+        self.assertEqual(user['app_path'], 'core/user')
+        self.assertEqual(user['variants'], ['contact'])
+        self.assertEqual(youtube['app_path'], None)
+        self.assertEqual(youtube['help_text'], YoutubeInline.help_text)
+        self.assertEqual(youtube['args'], [
+            {'name': 'height', 'help_text': 'In pixels', 'options': []},
+            {'name': 'width', 'help_text': 'In pixels', 'options': []},
+        ])
+
+
+class JSInlineConfigViewTestCase(TestCase):
+
+    urls = 'core.test_urls'
+
+    def setUp(self):
+        self.old_registry = inlines_module.registry
+        inlines_module.registry = Registry()
+        inlines_module.registry.register('youtube', YoutubeInline)
+        staff = StaffUser.objects.create_user('staff', 'staff@example.com', 'secret')
+        staff.is_staff = True
+        staff.save()
+        self.client.login(username='staff', password='secret')
+
+    def tearDown(self):
+        inlines_module.registry = self.old_registry
+
+    def testETag(self):
+        response = self.client.get('/inlines/inline_config.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"%s"' % self.current_etag())
+        self.assert_("DjangoInlines.inlines.push('youtube');" in response.content)
+        self.assert_('must-revalidate' in response['Cache-Control'])
+
+    def testNotModified(self):
+        etag = self.client.get('/inlines/inline_config.js')['ETag']
+        response = self.client.get('/inlines/inline_config.js', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, '')
+
+    def testVersionedUrl(self):
+        url = str(DelayedUrlReverse('js_inline_config', version=js_inline_config_version))
+        self.assertEqual(url, '/inlines/inline_config.js?v=%s' % self.current_etag()[:12])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assert_('max-age=31536000' in response['Cache-Control'])
+        self.assert_('must-revalidate' not in response['Cache-Control'])
+
+    def testRegisterInvalidates(self):
+        url = str(DelayedUrlReverse('js_inline_config', version=js_inline_config_version))
+        etag = self.client.get('/inlines/inline_config.js')['ETag']
+        inlines_module.registry.register('video', YoutubeInline)
+
+        new_url = str(DelayedUrlReverse('js_inline_config', version=js_inline_config_version))
+        self.assertNotEqual(new_url, url)
+        response = self.client.get('/inlines/inline_config.js', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assert_("DjangoInlines.inlines.push('video');" in response.content)
+        # The old version is no longer cached for a year.
+        self.assert_('must-revalidate' in self.client.get(url)['Cache-Control'])
+
+    def current_etag(self):
+        return get_js_inline_config()[2]
+
+
+class InlineSchemasViewTestCase(TestCase):
+
+    urls = 'core.test_urls'
+
+    def setUp(self):
+        self.old_registry = inlines_module.registry
+        inlines_module.registry = Registry()
+        inlines_module.registry.register('youtube', YoutubeInline)
+        staff = StaffUser.objects.create_user('staff', 'staff@example.com', 'secret')
+        staff.is_staff = True
+        staff.save()
+        self.client.login(username='staff', password='secret')
+
+    def tearDown(self):
+        inlines_module.registry = self.old_registry
+
+    def testSchemas(self):
+        response = self.client.get('/inlines/inline_schemas.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['ETag'], '"%s"' % get_inline_schemas()[2])
+        schemas = simplejson.loads(response.content)['inlines']
+        self.assertEqual([schema['name'] for schema in schemas], ['youtube'])
+
+    def testNotModified(self):
+        etag = self.client.get('/inlines/inline_schemas.json')['ETag']
+        response = self.client.get('/inlines/inline_schemas.json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def testConfigPointsAtCurrentSchemas(self):
+        config = self.client.get('/inlines/inline_config.js').content
+        url = '/inlines/inline_schemas.json?v=%s' % get_inline_schemas()[2][:12]
+        self.assert_(url in config)
+        self.assert_('max-age=31536000' in self.client.get(url)['Cache-Control'])
+
+        inlines_module.registry.register('video', YoutubeInline)
+        config = self.client.get('/inlines/inline_config.js').content
+        self.assert_(url not in config)
+        schemas = simplejson.loads(self.client.get('/inlines/inline_schemas.json').content)['inlines']
+        self.assertEqual([schema['name'] for schema in schemas], ['video', 'youtube'])
+
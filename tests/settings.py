@@ -2,6 +2,9 @@ DATABASE_ENGINE = 'sqlite3'
 DATABASE_NAME = 'django_inlines_tests.db'
  
 INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
     'core',
     'django_inlines',
 ]